@@ -1,8 +1,11 @@
 from .read import load_bib as read
 from .read import getkeys as listKeyinLibrary
 from .read import getcitekeys as listCitekeys
+from .index import LibraryIndex, CitekeyAllocator
+from .lazy import LazyLibrary, load_lazy as read_lazy
 from .dedupe import dedupe_bib_library as dedupe
 from .clean import EntryCleaner
 from .replace import replace_doi_in_file as replacedois
-from .openalex import async_get_cited, async_get_citing, async_get_metadata_from_doi
-from .bibtexfromdoi import async_get_bibtex_from_url
\ No newline at end of file
+from .openalex import async_get_cited, async_get_citing, async_get_metadata_from_doi, async_get_metadata_from_dois
+from .bibtexfromdoi import async_get_bibtex_from_url, async_get_crossref_works
+from .pipeline import resolve_dois
\ No newline at end of file
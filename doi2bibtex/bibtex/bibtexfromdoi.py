@@ -7,48 +7,153 @@ from typing import Union
 import httpx
 from doi2bibtex.util.getdoilogger import return_logger
 from doi2bibtex.util import validate_and_fix_bibtex
-from .openalex import async_get_metadata_from_doi
+from doi2bibtex.util.httpclient import get_client
+from doi2bibtex.util.doicache import get_doicache
+from doi2bibtex.util.singleflight import singleflight, doi_key
+from .openalex import async_get_metadata_from_doi, register_fields
+from .csl import csl_to_bibtex, abstract_from_csl
 from colorama import Fore, Style
 from json import JSONDecodeError
 
 BASE_URL = 'https://dx.doi.org/'
+# Ask for CSL-JSON first (rendered locally, and it carries article-number),
+# and take BibTeX from registrars that cannot produce it.
+ACCEPT = 'application/vnd.citationstyles.csl+json, application/x-bibtex;q=0.9'
+CROSSREF_URL = 'https://api.crossref.org/works'
+CROSSREF_BATCH = 100
+# Only what csl_to_bibtex and add_pages read
+CROSSREF_SELECT = ('DOI,type,title,author,container-title,volume,issue,page,article-number,'
+                   'publisher,ISSN,URL,issued,published-print,published-online,abstract')
+BACKENDS = ('doi', 'crossref')
 PAGERES = (re.compile(r'^\d+\.\d+/\D+\.20(\d+)$'),
            re.compile(r'^\d+\.\d+/\D+(\d+)$'),
            re.compile(r'^\d+\.\d+/\D+\.\d+\.(\d+)$'))
 
 logger = return_logger(__name__)
 
+# OpenAlex metadata read while building entries
+register_fields('bibtex', ('abstract',))
+register_fields('pages', ('biblio',))
 
-async def async_get_bibtex_from_url(doi: Union[str, bytes, None], metadata={}) -> str:
+
+async def async_get_crossref_works(dois, client: httpx.AsyncClient = None) -> dict:
+    """
+    Look DOIs up on the Crossref REST API, CROSSREF_BATCH at a time.
+
+    Args:
+        dois: DOI strings (without https://doi.org/ prefix)
+        client: Optional shared httpx.AsyncClient (defaults to the pooled client)
+
+    Returns:
+        Dictionary mapping lower-cased DOIs to Crossref work records; DOIs
+        Crossref does not know (other registrars) are simply absent.
+    """
+    if get_doicache().offline:
+        return {}
+    if client is None:
+        client = get_client()
+    # A comma would split the filter, leave those to content negotiation
+    keys = list(dict.fromkeys(doi.lower() for doi in dois if doi and ',' not in doi))
+    works = {}
+
+    async def fetch_batch(batch):
+        params = {'filter': ','.join(f'doi:{doi}' for doi in batch),
+                  'rows': CROSSREF_BATCH,
+                  'select': CROSSREF_SELECT}
+        try:
+            response = await client.get(CROSSREF_URL, params=params, timeout=30)
+            response.raise_for_status()
+            items = response.json().get('message', {}).get('items', [])
+        except httpx.HTTPStatusError as err:
+            logger.error(f"Error {err.response.status_code} fetching {len(batch)} DOIs from Crossref")
+            return
+        except (httpx.HTTPError, JSONDecodeError) as err:
+            logger.error(f"Error fetching {len(batch)} DOIs from Crossref: {err}")
+            return
+        for item in items:
+            works[item.get('DOI', '').lower()] = item
+
+    await asyncio.gather(*[fetch_batch(keys[i:i + CROSSREF_BATCH])
+                           for i in range(0, len(keys), CROSSREF_BATCH)])
+    logger.debug(f"Crossref returned {len(works)} of {len(keys)} DOIs")
+    return works
+
+
+async def _negotiate(doi: str, client: httpx.AsyncClient):
+    '''Fetch doi from doi.org by content negotiation; returns (bibtex, csl or None).'''
+    bibtex = ''
+    csl = None
+    url = BASE_URL + doi
+    try:
+        response = await client.get(url,
+                                    headers={'Accept': ACCEPT},
+                                    follow_redirects=True,
+                                    timeout=30)
+        response.raise_for_status()
+        if 'json' in response.headers.get('content-type', ''):
+            csl = response.json()
+            bibtex = csl_to_bibtex(csl)
+        else:
+            bibtex = response.text
+    except JSONDecodeError:
+        logger.error(f"{url} did not return valid json.")
+    except httpx.HTTPStatusError as err:
+        if err.response.status_code == 404:
+            logger.error(f"Could not resolve {doi}")
+        elif err.response.status_code == 429:
+            logger.error(f"Rate-limit exteeded for {BASE_URL}")
+        else:
+            logger.error(f"Error {err.response.status_code} while fetching {url}")
+    except httpx.InvalidURL:
+        logger.error(f"'{doi}' is not a valid url")
+    except httpx.ReadTimeout:
+        logger.error(f"Timeout fetching {url}")
+    except httpx.ConnectError as err:
+        logger.error(f"Connection error fetching {url}: {err}")
+    return bibtex, csl
+
+
+@singleflight(doi_key)
+async def _get_record(doi: str, client: httpx.AsyncClient = None, csl: dict = None):
+    '''Return the (bibtex, csl or None) doi.org or Crossref gave for doi, before any
+    enrichment, from the DOI cache when possible.'''
+    cache = get_doicache()
+    record = cache.get('record', doi)
+    if record is not None:
+        logger.debug(f"Using cached record for {doi}")
+        return record['bibtex'], record['csl']
+    if cache.offline:
+        logger.warning(f"{doi} is not cached (offline mode).")
+        return '', None
+    if client is None:
+        client = get_client()
+    if csl:
+        bibtex = csl_to_bibtex(csl)
+    else:
+        bibtex, csl = await _negotiate(doi, client)
+    if bibtex.strip():
+        cache.put('record', doi, {'bibtex': bibtex, 'csl': csl})
+    return bibtex, csl
+
+
+async def async_get_bibtex_from_url(doi: Union[str, bytes, None], metadata={},
+                                    client: httpx.AsyncClient = None, csl: dict = None) -> str:
+    '''Return BibTeX for doi; a CSL(-like) record that is already at hand (e.g. from
+    Crossref) is rendered directly, otherwise doi.org is asked for one.
+
+    Only the raw record is cached; the abstract and pages from metadata are
+    added on every call, so a lookup without metadata does not stick.'''
     if doi is None:
         return ''
     if isinstance(doi, bytes):
         doi = str(doi, encoding='utf-8')
-    bibtex = ''
-    url = BASE_URL + doi
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url,
-                                        headers={'Accept': 'application/x-bibtex'},
-                                        follow_redirects=True,
-                                        timeout=30)
-            response.raise_for_status()
-            bibtex = response.text
-        except httpx.HTTPStatusError as err:
-            if err.response.status_code == 404:
-                logger.error(f"Could not resolve {doi}")
-            elif err.response.status_code == 429:
-                logger.error(f"Rate-limit exteeded for {BASE_URL}")
-            else:
-                logger.error(f"Error {err.response.status_code} while fetching {url}")
-        except httpx.InvalidURL:
-            logger.error(f"'{doi}' is not a valid url")
-        except httpx.ReadTimeout:
-            logger.error(f"Timeout fetching {url}")
-        except httpx.ConnectError as err:
-            logger.error(f"Connection error fetching {url}: {err}")
+    bibtex, csl = await _get_record(doi, client=client, csl=csl)
+    if not bibtex.strip():
+        return ''
     
     abstract = metadata.get('abstract', '')
+    if not abstract and csl is not None:
+        abstract = abstract_from_csl(csl)
     if abstract:
         _biblist = bibtex.split(',')
         _biblist.insert(-1, 'abstract={%s}' % abstract)
@@ -57,13 +162,13 @@ async def async_get_bibtex_from_url(doi: Union[str, bytes, None], metadata={}) -
         logger.debug(f"No abstract found for {doi}")
         
     if 'pages' not in bibtex.lower():
-        bibtex = await add_pages(bibtex, doi, metadata)
+        bibtex = await add_pages(bibtex, doi, metadata, client=client, csl=csl)
     
     # bibtex = validate_and_fix_bibtex(bibtex)
     
     return bibtex
 
-async def add_pages(bibtex, doi, metadata):
+async def add_pages(bibtex, doi, metadata, client: httpx.AsyncClient = None, csl=None):
     page = ''
     logger.info("Looking for page in json from DOI:%s", doi)
     
@@ -76,30 +181,35 @@ async def add_pages(bibtex, doi, metadata):
     if page_info['first_page']:
         page = page_info['first_page']
     key = 'alex'
-    if not page:
+    if not page and csl is not None:
+        # Already have the CSL-JSON, no need to ask doi.org again
+        key = 'article-number'
+        page = csl.get(key, '')
+    elif not page and not get_doicache().offline:
         url = BASE_URL + doi
         json_bib = {}
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url,
-                                            headers={'Accept': 'application/json'},
-                                            follow_redirects=True,
-                                            timeout=30)
-                response.raise_for_status()
-                json_bib = response.json()
-            except httpx.HTTPStatusError as err:
-                if err.response.status_code == 404:
-                    logger.error(f"Could not resolve {doi}")
-                else:
-                    logger.error(f"Error {err.response.status_code} while fetching {url}")
-            except httpx.InvalidURL:
-                logger.error(f"'{doi}' is not a valid url")
-            except JSONDecodeError:
-                logger.error(f"{url} did not return valid json.")
-            except httpx.ReadTimeout:
-                logger.error(f"Timeout fetching {url}")
-            except httpx.ConnectError as err:
-                logger.error(f"Connection error fetching {url}: {err}")
+        if client is None:
+            client = get_client()
+        try:
+            response = await client.get(url,
+                                        headers={'Accept': 'application/json'},
+                                        follow_redirects=True,
+                                        timeout=30)
+            response.raise_for_status()
+            json_bib = response.json()
+        except httpx.HTTPStatusError as err:
+            if err.response.status_code == 404:
+                logger.error(f"Could not resolve {doi}")
+            else:
+                logger.error(f"Error {err.response.status_code} while fetching {url}")
+        except httpx.InvalidURL:
+            logger.error(f"'{doi}' is not a valid url")
+        except JSONDecodeError:
+            logger.error(f"{url} did not return valid json.")
+        except httpx.ReadTimeout:
+            logger.error(f"Timeout fetching {url}")
+        except httpx.ConnectError as err:
+            logger.error(f"Connection error fetching {url}: {err}")
         for key in ('article-number',):
             if key in json_bib:
                 page = json_bib[key]
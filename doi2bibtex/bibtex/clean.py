@@ -1,11 +1,11 @@
+import asyncio
 from typing import Dict, List, Tuple, Optional
-import Levenshtein
 import bibtexparser
 from bibtexparser.model import Entry, Field
 from colorama import Fore, Style
 from titlecase import titlecase
 from colorama import Fore,Style
-from doi2bibtex.util import getISO4
+from doi2bibtex.util import getISO4, JournalDB
 from .bibtexfromdoi import async_get_bibtex_from_url
 from doi2bibtex.util.getdoilogger import return_logger
 
@@ -29,20 +29,29 @@ class EntryCleaner:
     
     REQUIRED_KEYS = ('title', 'journal')
     REMOVE_KEYS = ('file', 'bdsk-file-1')  # File entries to remove from shared bibs
+    CONCURRENCY = 8  # Page lookups in flight during prefetch
     
-    def __init__(self, library, journals: Dict[str, str]):
+    def __init__(self, library, journals: Dict[str, str], store: Optional[dict] = None):
         """Initialize the cleaner with library and journals database.
         
         Args:
             library: BibTeX library to clean
-            journals: Dictionary mapping full journal names to abbreviations
+            journals: Dictionary (or JournalDB) mapping full journal names to abbreviations
+            store: Remembered decisions and ISO4 abbreviations (see util.loaddecisions)
         """
         self.library = library
         self.journals = journals
+        # A plain dict gets indexed in an in-memory JournalDB
+        self.index = journals if isinstance(journals, JournalDB) else JournalDB.from_journals(journals)
         self.stop = False  # Flag for interrupting processing
         self.errors: List[Entry] = []
-        self.history: Dict[str, Optional[str]] = {}  # Cache of user decisions
+        store = store or {}
+        self.history: Dict[str, Optional[str]] = dict(store.get('decisions', {}))  # Journal -> abbreviation (None: never)
         self.custom: Dict[str, str] = {}  # Custom abbreviations
+        self.matches: Dict[str, Tuple[str, float]] = {}  # Prefetched fuzzy matches
+        self.iso4: Dict[str, str] = dict(store.get('iso4', {}))  # ISO4 abbreviations
+        self.pages: Dict[str, str] = {}  # Prefetched pages by citekey
+        self.decisions: Dict[str, Optional[str]] = {}  # Reviewed journal -> abbreviation (None: keep)
         self.stats = {
             'n_cleaned': 0,
             'n_parsed': 0,
@@ -50,67 +59,98 @@ class EntryCleaner:
         }
 
     async def clean(self) -> Entry:
-        """Clean entire library, replacing entries with cleaned versions."""
-        for entry in self.library.entries:
-            if self.stop:
-                break
-            self.library.replace(entry, await self._clean_entry(entry))
+        """Clean entire library, replacing entries with cleaned versions.
+
+        Runs in phases so the network never waits on the user or vice versa:
+        missing pages and ISO4 abbreviations are fetched concurrently first,
+        then every distinct journal that needs a decision is reviewed in one
+        go, then the results are applied to the entries."""
+        entries = [entry for entry in self.library.entries if self._check_entry(entry)]
+        pending = [entry for entry in entries
+                   if not self.index.is_abbreviation(entry.fields_dict['journal'].value)]
+        journals = list(dict.fromkeys(entry.fields_dict['journal'].value for entry in pending))
+        await self._prefetch(journals, pending)
+        self._review(journals)
+        for entry in entries:
+            journal = entry.fields_dict['journal'].value
+            if journal not in self.decisions and not self.index.is_abbreviation(journal):
+                continue  # Review was interrupted before this journal
+            self.library.replace(entry, self._clean_entry(entry))
         return self.library
 
-    async def _clean_entry(self, entry: Entry) -> Entry:
-        """Clean a single entry, handling validation and cleaning steps."""
-        # Validate entry type and required fields
+    def _check_entry(self, entry: Entry) -> bool:
+        """Validate entry type and required fields."""
         if entry.entry_type.lower() != 'article':
             print(f'{Fore.RED}Cannot parse {entry.key} ({entry.entry_type})')
             self.errors.append(entry)
-            return entry
-            
+            return False
+
         for key in self.REQUIRED_KEYS:
             if key not in entry.fields_dict:
                 print(f'{Fore.RED}Cannot parse {entry.key} (missing: {key})')
                 self.errors.append(entry)
-                return entry
+                return False
+        return True
 
-        # Clean title
-        clean_title = titlecase(entry.fields_dict['title'].value)
-        if clean_title != entry.fields_dict['title'].value:
-            self.stats['n_cleaned'] += 1
-            entry.fields_dict['title'].value = clean_title
+    async def _prefetch(self, journals: List[str], entries: List[Entry]):
+        """Fetch missing pages and ISO4 abbreviations concurrently."""
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+        # Remembered journals need neither fuzzy matching nor ISO4
+        self.matches = {journal: self._fuzzy_match(journal) for journal in journals
+                        if journal not in self.history}
 
-        # Remove unwanted fields
-        for key in self.REMOVE_KEYS:
-            entry.fields_dict.pop(key, None)
+        # The ISO4 lemmatizer is not thread-safe (its first call loads it), so
+        # lookups run one at a time, off the event loop, beside the page fetches
+        iso4_lock = asyncio.Lock()
 
-        # Clean author formatting
-        if 'author' in entry.fields_dict:
-            author_value = entry.fields_dict['author'].value
-            if ' and ' not in author_value and ',' in author_value:
-                authors = ['{' + author.strip() + '}' for author in author_value.split(',')]
-                entry.fields_dict['author'].value = " and ".join(authors)
+        async def iso4(journal):
+            async with iso4_lock:
+                try:
+                    self.iso4[journal] = await asyncio.to_thread(getISO4, journal)
+                except Exception as e:  # _decide retries it in the loop
+                    logger.warning(f'Failed to prefetch the ISO4 abbreviation of {journal}: {e}')
 
-        # Handle journal abbreviations
-        journal_value = entry.fields_dict['journal'].value
-        if journal_value in self.journals.values():
-            logger.debug("Entry already parsed, skipping user input.")
-            return entry
+        async def pages(entry):
+            async with semaphore:
+                try:
+                    self.pages[entry.key] = await get_pages(entry.fields_dict['doi'])
+                except Exception as e:
+                    logger.warning(f'Failed to fetch pages for {entry.key}: {e}')
 
-        return await self._handle_journal_abbreviation(entry)
+        tasks = [iso4(journal) for journal in self.matches
+                 if journal not in self.iso4 and self.matches[journal][1] < 0.9]
+        tasks += [pages(entry) for entry in entries
+                  if 'pages' not in entry.fields_dict and 'doi' in entry.fields_dict]
+        if tasks:
+            logger.info(f'Prefetching {len(tasks)} ISO4 abbreviations and page numbers.')
+            await asyncio.gather(*tasks)
 
-    async def _handle_journal_abbreviation(self, entry: Entry) -> Entry:
+    def _review(self, journals: List[str]):
+        """Decide on (asking the user where needed) the abbreviation of each journal."""
+        for journal in journals:
+            should_abbreviate, fuzzy_match = self._decide(journal)
+            if self.stop:  # Handle interruption
+                break
+            self.decisions[journal] = fuzzy_match if should_abbreviate else None
+            self.history[journal] = self.decisions[journal]
+
+    def _decide(self, journal: str) -> Tuple[bool, str]:
         """Handle journal abbreviation with fuzzy matching and user input."""
-        journal = entry.fields_dict['journal'].value
-        fuzzy_match, score = self._fuzzy_match(journal)
+        # Remembered decisions, including "never abbreviate", need no input
+        if journal in self.history:
+            return bool(self.history[journal]), self.history[journal]
+
+        fuzzy_match, score = self.matches.get(journal) or self._fuzzy_match(journal)
         should_abbreviate = False
 
-        # Check history or determine if we should abbreviate
-        if journal in self.history:
-            fuzzy_match = self.history[journal]
-            should_abbreviate = bool(fuzzy_match)
-        elif score > 0.95:
+        # Determine if we should abbreviate
+        if score > 0.95:
             should_abbreviate = True
         else:
             if score < 0.9:
-                iso4_abbrev = getISO4(journal)
+                if journal not in self.iso4:
+                    self.iso4[journal] = getISO4(journal)
+                iso4_abbrev = self.iso4[journal]
                 if iso4_abbrev == journal or journal.replace('.', ',') == iso4_abbrev:
                     should_abbreviate = True
                     fuzzy_match = journal
@@ -121,33 +161,47 @@ class EntryCleaner:
         # Get user input if needed
         if not should_abbreviate:
             should_abbreviate, fuzzy_match = self._get_user_input(journal, fuzzy_match, score)
-            if self.stop:  # Handle interruption
-                return entry
+        return should_abbreviate, fuzzy_match
+
+    def _clean_entry(self, entry: Entry) -> Entry:
+        """Clean a single (validated) entry using the prefetched data and journal decisions."""
+        # Clean title
+        clean_title = titlecase(entry.fields_dict['title'].value)
+        if clean_title != entry.fields_dict['title'].value:
+            self.stats['n_cleaned'] += 1
+            entry.fields_dict['title'].value = clean_title
+
+        # Remove unwanted fields
+        for key in self.REMOVE_KEYS:
+            entry.fields_dict.pop(key, None)
+
+        # Clean author formatting
+        if 'author' in entry.fields_dict:
+            author_value = entry.fields_dict['author'].value
+            if ' and ' not in author_value and ',' in author_value:
+                authors = ['{' + author.strip() + '}' for author in author_value.split(',')]
+                entry.fields_dict['author'].value = " and ".join(authors)
+
+        # Handle journal abbreviations
+        journal = entry.fields_dict['journal'].value
+        if self.index.is_abbreviation(journal):
+            logger.debug("Entry already parsed, skipping user input.")
+            return entry
 
         # Apply abbreviation if approved
-        if should_abbreviate and journal != fuzzy_match:
-            self._apply_abbreviation(entry, journal, fuzzy_match)
+        abbreviation = self.decisions.get(journal)
+        if abbreviation and journal != abbreviation:
+            self._apply_abbreviation(entry, journal, abbreviation)
 
         # Handle pages
-        await self._handle_pages(entry)
-        
+        self._handle_pages(entry)
+
         self.stats['n_parsed'] += 1
         return entry
 
     def _fuzzy_match(self, journal: str) -> Tuple[str, float]:
         """Find closest matching journal name using Levenshtein distance."""
-        best_match = ('', 0)
-        
-        for full_name, abbrev in self.journals.items():
-            full_score = Levenshtein.ratio(journal, full_name)
-            abbrev_score = Levenshtein.ratio(journal, abbrev)
-            
-            if full_score > best_match[1]:
-                best_match = (abbrev, full_score)
-            if abbrev_score > best_match[1]:
-                best_match = (abbrev, abbrev_score)
-                
-        return best_match
+        return self.index.best_match(journal)
 
     def _get_user_input(self, journal: str, suggestion: str, score: float) -> Tuple[bool, str]:
         """Get user input for journal abbreviation decision."""
@@ -181,18 +235,16 @@ class EntryCleaner:
         self.stats['n_abbreviated'] += 1
         entry.fields_dict['journal'].value = abbreviated
 
-    async def _handle_pages(self, entry: Entry):
+    def _handle_pages(self, entry: Entry):
         """Handle page number formatting and addition."""
         if 'pages' not in entry.fields_dict:
-            doi = entry.fields_dict.get('doi', None)
-            if doi:
-                pages = await get_pages(doi)
-                if pages:
-                    logger.info(f'Inserting field pages = {pages}')
-                    try:
-                        entry.set_field(Field('pages', pages))
-                    except TypeError:
-                        logger.warning('Update biblatex parser needed (pip install --upgrade biblatexparser --pre)')
+            pages = self.pages.get(entry.key)
+            if pages:
+                logger.info(f'Inserting field pages = {pages}')
+                try:
+                    entry.set_field(Field('pages', pages))
+                except TypeError:
+                    logger.warning('Update biblatex parser needed (pip install --upgrade biblatexparser --pre)')
 
         if 'pages' in entry.fields_dict:
             entry.fields_dict['pages'].value = self._standardize_page_numbers(
@@ -0,0 +1,106 @@
+import re
+from doi2bibtex.util.getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+# CSL (and Crossref REST) work types -> BibTeX entry types
+ENTRY_TYPES = {
+    'article-journal': 'article',
+    'journal-article': 'article',
+    'article': 'article',
+    'article-magazine': 'article',
+    'article-newspaper': 'article',
+    'book': 'book',
+    'monograph': 'book',
+    'edited-book': 'book',
+    'chapter': 'incollection',
+    'book-chapter': 'incollection',
+    'paper-conference': 'inproceedings',
+    'proceedings-article': 'inproceedings',
+    'report': 'techreport',
+    'thesis': 'phdthesis',
+    'dissertation': 'phdthesis',
+}
+CONTAINER_FIELD = {'incollection': 'booktitle', 'inproceedings': 'booktitle'}
+MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+TAGS = re.compile(r'<[^>]+>')
+
+
+def _first(value):
+    '''CSL-JSON has strings, Crossref REST has single-element lists.'''
+    if isinstance(value, list):
+        return value[0] if value else ''
+    return value or ''
+
+
+def _clean(value) -> str:
+    value = TAGS.sub('', str(_first(value)))
+    return ' '.join(value.replace('{', '').replace('}', '').split())
+
+
+def _authors(csl: dict) -> str:
+    names = []
+    for author in csl.get('author', []):
+        if author.get('family'):
+            name = _clean(author['family'])
+            if author.get('given'):
+                name = f"{name}, {_clean(author['given'])}"
+        elif author.get('literal') or author.get('name'):
+            name = '{%s}' % _clean(author.get('literal') or author.get('name'))
+        else:
+            continue
+        names.append(name)
+    return ' and '.join(names)
+
+
+def _date_parts(csl: dict):
+    for key in ('issued', 'published-print', 'published-online', 'published', 'created'):
+        parts = csl.get(key, {}).get('date-parts', [[]])
+        if parts and parts[0] and parts[0][0]:
+            return parts[0]
+    return []
+
+
+def abstract_from_csl(csl: dict) -> str:
+    '''Return the (JATS-stripped) abstract registered with the DOI, if any.'''
+    return _clean(csl.get('abstract', ''))
+
+
+def citekey(csl: dict) -> str:
+    '''Build a Family_Year key the way doi.org does.'''
+    family = ''
+    for author in csl.get('author', []):
+        family = author.get('family') or author.get('literal') or author.get('name') or ''
+        if family:
+            break
+    if not family:
+        family = _clean(csl.get('title', '')).split(' ')[0] or 'Anonymous'
+    family = re.sub(r'\W+', '_', TAGS.sub('', family)).strip('_')
+    date = _date_parts(csl)
+    return f"{family}_{date[0]}" if date else family
+
+
+def csl_to_bibtex(csl: dict) -> str:
+    '''Render a CSL-JSON (or Crossref REST) work as a BibTeX entry string.'''
+    if not csl:
+        return ''
+    entry_type = ENTRY_TYPES.get(csl.get('type', ''), 'misc')
+    date = _date_parts(csl)
+    fields = [('title', _clean(csl.get('title', '')))]
+    if csl.get('author'):
+        fields.append(('author', _authors(csl)))
+    fields.append((CONTAINER_FIELD.get(entry_type, 'journal'), _clean(csl.get('container-title', ''))))
+    fields += [('volume', _clean(csl.get('volume', ''))),
+               ('number', _clean(csl.get('issue', ''))),
+               ('pages', _clean(csl.get('page', '')).replace('–', '-')),
+               ('publisher', _clean(csl.get('publisher', ''))),
+               ('ISSN', _clean(csl.get('ISSN', ''))),
+               ('url', _clean(csl.get('URL', ''))),
+               ('DOI', _clean(csl.get('DOI', '')))]
+    if date:
+        fields.append(('year', str(date[0])))
+    _fields = ['%s={%s}' % (key, value) for key, value in fields if value]
+    if len(date) > 1 and str(date[1]).isdigit() and 1 <= int(date[1]) <= 12:
+        _fields.append(f'month={MONTHS[int(date[1]) - 1]}')
+    logger.debug(f"Rendered {entry_type} for {csl.get('DOI', '')} from CSL-JSON")
+    return '@%s{%s, %s}' % (entry_type, citekey(csl), ', '.join(_fields))
@@ -1,39 +1,14 @@
 from collections import defaultdict
-from itertools import combinations
 from rich.console import Console
 from doi2bibtex.util.getdoilogger import return_logger as getlogger
 from doi2bibtex.llm.config import get_llm_provider, save_llm_config, load_llm_config
+from doi2bibtex.llm.adjudicate import adjudicate
 from Levenshtein import ratio
+from .fuzzy import find_duplicates, build_lsh
 
 logger = getlogger(__name__)
 console = Console()
 
-def _format_entry_for_llm(entry):
-    """Formats a bibtex entry into a simple string for the LLM prompt."""
-    details = [f"- Type: {entry.entry_type}", f"- Key: {entry.key}"]
-    for key, value in entry.fields_dict.items():
-        details.append(f"- {key.capitalize()}: {value.value}")
-    return "\n".join(details)
-
-def _get_llm_verdict(llm_provider, entry1, entry2):
-    """Gets a verdict from the LLM on whether two entries are duplicates."""
-    prompt = f"""You are a bibliographic assistant. Your task is to determine if the following two BibTeX entries refer to the same publication. Consider variations in title, author lists, page numbers, and publication venue (e.g., preprint vs. final journal article).
-
-Respond with only the word 'YES' or 'NO'.
-
-Entry 1:
-{_format_entry_for_llm(entry1)}
-
-Entry 2:
-{_format_entry_for_llm(entry2)}
-
-Are these two entries for the same publication?"""
-    
-    response = llm_provider.get_completion(prompt)
-    if response:
-        return response.strip().upper() == 'YES'
-    return False
-
 def dedupe_bib_library(library, use_llm=False, llm_model=None):
     '''Check for duplicate bibtex entries'''
     logger.debug("Starting dedupe run")
@@ -56,35 +31,25 @@ def dedupe_bib_library(library, use_llm=False, llm_model=None):
 
     if use_llm:
         # LLM-based deduplication
-        # Pre-filtering: Group by year and similar journal title
-        candidate_groups = defaultdict(list)
-        for entry in library.entries:
-            year_field = entry.fields_dict.get('year')
-            journal_field = entry.fields_dict.get('journal')
-            if year_field and journal_field:
-                year = year_field.value
-                journal = journal_field.value
-                # Simple key for grouping
-                candidate_key = (year, journal[:5].lower())
-                candidate_groups[candidate_key].append(entry.key)
-        
-        llm_dupe_pairs = []
-        for group in candidate_groups.values():
-            if len(group) < 2:
-                continue
-            for key1, key2 in combinations(group, 2):
-                entry1 = library.entries_dict[key1]
-                entry2 = library.entries_dict[key2]
-
-                # Additional check: title similarity
-                title1_field = entry1.fields_dict.get('title')
-                title2_field = entry2.fields_dict.get('title')
-                if title1_field and title2_field:
-                    title1 = title1_field.value
-                    title2 = title2_field.value
-                    if ratio(title1, title2) > 0.8:
-                        if _get_llm_verdict(llm_provider, entry1, entry2):
-                            llm_dupe_pairs.append((key1, key2))
+        # Pre-filtering: title LSH candidates within a year of each other,
+        # so preprints (no journal) and busy journals cost near-linear work
+        candidates = []
+        for key1, key2 in sorted(build_lsh(library.entries).candidates(year_window=1)):
+            entry1 = library.entries_dict[key1]
+            entry2 = library.entries_dict[key2]
+
+            # Additional check: title similarity
+            title1_field = entry1.fields_dict.get('title')
+            title2_field = entry2.fields_dict.get('title')
+            if title1_field and title2_field:
+                title1 = title1_field.value
+                title2 = title2_field.value
+                if ratio(title1, title2) > 0.8:
+                    candidates.append((entry1, entry2))
+
+        verdicts = adjudicate(llm_provider, candidates)
+        llm_dupe_pairs = [(entry1.key, entry2.key) for (entry1, entry2), verdict
+                          in zip(candidates, verdicts) if verdict]
         
         # Find connected components to group the duplicates correctly
         adj = defaultdict(list)
@@ -108,37 +73,9 @@ def dedupe_bib_library(library, use_llm=False, llm_model=None):
                 dupe_groups.append(component)
 
     else:
-        # Standard, non-LLM deduplication
-        dupe_candidates = defaultdict(list)
-        for entry in library.entries:
-            _key = entry.key
-            _p, _v, _j, _doi = '', '', '', ''
-            
-            fields_lower = {k.lower(): v for k, v in entry.fields_dict.items()}
-            
-            if 'pages' in fields_lower:
-                _p = fields_lower['pages'].value.split('-')[0].strip().strip('-')
-            elif 'page' in fields_lower:
-                _p = fields_lower['page'].value.split('-')[0].strip().strip('-')
-            
-            if 'journal' in fields_lower:
-                _j = fields_lower['journal'].value
-            
-            if 'volume' in fields_lower:
-                _v = fields_lower['volume'].value
-                
-            if 'doi' in fields_lower:
-                _doi = fields_lower['doi'].value
-
-            if _doi:
-                dupe_key = ('doi', _doi)
-            elif _p and _v and _j:
-                dupe_key = ('pvj', _p, _v, _j)
-            else:
-                continue
-            dupe_candidates[dupe_key].append(_key)
-        
-        dupe_groups.extend([keys for keys in dupe_candidates.values() if len(keys) > 1])
+        # Standard, non-LLM deduplication: exact DOI/page-volume-journal keys
+        # plus near-identical titles found through LSH blocking
+        dupe_groups.extend(find_duplicates(library.entries))
 
     if dupe_groups:
         return dodedupe(library, dupe_groups)
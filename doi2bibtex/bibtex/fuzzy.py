@@ -0,0 +1,159 @@
+'''Near-duplicate detection: exact keys, then MinHash/LSH blocking, then Levenshtein verification'''
+import re
+import zlib
+import random
+from collections import defaultdict
+from itertools import combinations
+from Levenshtein import ratio
+from doi2bibtex.util.getdoilogger import return_logger as getlogger
+from .index import normalize_doi, normalize_title
+
+logger = getlogger(__name__)
+
+BANDS = 16            # LSH bands x rows = MinHash signature length;
+ROWS = 2              # titles sharing a third of their word pairs are likely to share a band
+TITLE_RATIO = 0.9     # Levenshtein ratio two titles need to count as the same
+AUTHOR_RATIO = 0.8    # ...and first authors, when both entries have one
+MIN_TITLE = 12        # Shorter titles ("Erratum") are too generic to match on
+MAX_BUCKET = 100      # Buckets bigger than this are boilerplate titles, skip them
+
+DIGITS = re.compile(r'\d+')
+ROMAN = re.compile(r'(?=[ivxl])(?:xl|l?x{0,3})(?:ix|iv|v?i{0,3})')  # i to xlix, e.g. "Part II"
+
+_rand = random.Random(1729)
+SALTS = [_rand.getrandbits(32) for _ in range(BANDS * ROWS)]
+
+
+def _fields(entry) -> dict:
+    return {k.lower(): str(v.value) for k, v in entry.fields_dict.items()}
+
+
+def _first_author(fields: dict) -> str:
+    author = fields.get('author', '').split(' and ')[0]
+    return normalize_title(author.split(',')[0] if ',' in author else author.split(' ')[-1])
+
+
+def _first_page(fields: dict) -> str:
+    return (fields.get('pages') or fields.get('page') or '').split('-')[0].strip()
+
+
+def _numbers(title: str) -> tuple:
+    '''Digit and Roman-numeral tokens of a normalized title ("Part 2", "Volume III").'''
+    words = title.split(' ')
+    return (sorted(int(_n) for _w in words for _n in DIGITS.findall(_w)),
+            sorted(_w for _w in words if ROMAN.fullmatch(_w)))
+
+
+def signature(title: str) -> list:
+    '''MinHash signature of the word-pair shingles of a normalized title.'''
+    words = title.split(' ')
+    shingles = [f'{_a} {_b}' for _a, _b in zip(words, words[1:])] or words
+    hashes = {(zlib.crc32(_s.encode('utf-8')) * 0x9E3779B1) & 0xFFFFFFFF for _s in shingles}
+    return [min(map(salt.__xor__, hashes)) for salt in SALTS]
+
+
+class TitleLSH:
+    '''Locality-sensitive hash of titles, blocked by year.
+
+    Entries land in one bucket per band of their MinHash signature;
+    entries that share a bucket and whose years are within year_window
+    of each other are candidate pairs.'''
+
+    def __init__(self):
+        self.buckets = defaultdict(lambda: defaultdict(list))  # (band, rows) -> year -> [keys]
+
+    def add(self, key: str, title: str, year: str = ''):
+        if len(title) < MIN_TITLE:
+            return
+        sig = signature(title)
+        for band in range(BANDS):
+            self.buckets[(band, tuple(sig[band * ROWS:(band + 1) * ROWS]))][year].append(key)
+
+    def candidates(self, year_window: int = 0) -> set:
+        '''Return the set of (key1, key2) pairs that share a bucket.'''
+        pairs = set()
+        for years in self.buckets.values():
+            if sum(map(len, years.values())) < 2:
+                continue
+            for year, keys in years.items():
+                near = list(keys)
+                if year_window and year.isdigit():
+                    for _d in range(1, year_window + 1):
+                        near += years.get(str(int(year) + _d), [])
+                if len(near) > MAX_BUCKET:
+                    logger.debug(f"Skipping a bucket of {len(near)} similar titles from {year}.")
+                    continue
+                pairs.update(tuple(sorted(_p)) for _p in combinations(near, 2) if _p[0] != _p[1])
+        return pairs
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, key):
+        self.parent.setdefault(key, key)
+        while self.parent[key] != key:
+            self.parent[key] = self.parent[self.parent[key]]
+            key = self.parent[key]
+        return key
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+    def groups(self):
+        _groups = defaultdict(list)
+        for key in self.parent:
+            _groups[self.find(key)].append(key)
+        return [keys for keys in _groups.values() if len(keys) > 1]
+
+
+def build_lsh(entries) -> TitleLSH:
+    lsh = TitleLSH()
+    for entry in entries:
+        fields = _fields(entry)
+        lsh.add(entry.key, normalize_title(fields.get('title', '')), fields.get('year', '').strip())
+    return lsh
+
+
+def same_work(fields1: dict, fields2: dict) -> bool:
+    '''Levenshtein check of titles (and first authors) of a candidate pair.
+
+    Titles must also carry the same numbers: the parts of a series differ
+    in little more than "Part 1" and "Part 2".'''
+    title1, title2 = normalize_title(fields1.get('title', '')), normalize_title(fields2.get('title', ''))
+    if ratio(title1, title2) < TITLE_RATIO or _numbers(title1) != _numbers(title2):
+        return False
+    author1, author2 = _first_author(fields1), _first_author(fields2)
+    return not (author1 and author2) or ratio(author1, author2) >= AUTHOR_RATIO
+
+
+def find_duplicates(entries) -> list:
+    '''Group entries that are likely the same work and return lists of their citekeys.
+
+    Entries are grouped when their normalized DOIs match, when page,
+    volume and journal match, or when their titles (and first authors)
+    are near-identical within the same year.'''
+    entries = list(entries)
+    fields = {entry.key: _fields(entry) for entry in entries}
+    groups = _UnionFind()
+    exact = {}
+    for key, _f in fields.items():
+        _doi = normalize_doi(_f.get('doi', '')) if _f.get('doi') else ''
+        _p, _v, _j = _first_page(_f), _f.get('volume', ''), _f.get('journal', '')
+        for _exact in (('doi', _doi) if _doi else None,
+                       ('pvj', _p, _v, _j) if _p and _v and _j else None):
+            if _exact is None:
+                continue
+            if _exact in exact:
+                groups.union(key, exact[_exact])
+            else:
+                exact[_exact] = key
+    pairs = build_lsh(entries).candidates()
+    verified = 0
+    for key1, key2 in pairs:
+        if groups.find(key1) != groups.find(key2) and same_work(fields[key1], fields[key2]):
+            groups.union(key1, key2)
+            verified += 1
+    logger.debug(f"Checked {len(pairs)} title candidate pairs, {verified} near-duplicates.")
+    return groups.groups()
@@ -0,0 +1,123 @@
+import re
+import threading
+from collections import defaultdict
+from doi2bibtex.util.getdoilogger import return_logger as getlogger
+
+logger = getlogger(__name__)
+
+DOIPREFIX = re.compile(r'^(https?://(dx\.)?doi\.org/|doi:)', re.IGNORECASE)
+NONWORD = re.compile(r'[\W_]+')
+
+
+def normalize_doi(doi) -> str:
+    if isinstance(doi, bytes):
+        doi = str(doi, encoding='utf-8')
+    return DOIPREFIX.sub('', str(doi).strip()).lower()
+
+
+def normalize_title(title) -> str:
+    '''Lower-case alphanumerics only, so braces, accents macros and punctuation do not matter.'''
+    return ' '.join(NONWORD.sub(' ', str(title).lower()).split())
+
+
+def _field(entry, name):
+    '''Case-insensitive field lookup (DOI vs doi).'''
+    for _field in entry.fields_dict:
+        if _field.lower() == name:
+            return str(entry.fields_dict[_field].value)
+    return ''
+
+
+def _letters(n: int) -> str:
+    '''0 -> a, 25 -> z, 26 -> aa, ...'''
+    suffix = ''
+    n += 1
+    while n:
+        n, rem = divmod(n - 1, 26)
+        suffix = chr(ord('a') + rem) + suffix
+    return suffix
+
+
+class CitekeyAllocator:
+    '''Hand out collision-free citekeys: smith2020, smith2020a, smith2020b, ...
+
+    Keeps the next suffix per base key, so allocation does not depend on the
+    order other bases collided in and stays O(1) however large the library
+    is. Keys are compared case-insensitively, like BibTeX does.'''
+
+    def __init__(self, keys=()):
+        self.taken = set()
+        self._next = {}  # lower-case base key -> index of the next suffix to try
+        self._lock = threading.Lock()
+        for key in keys:
+            self.reserve(key)
+
+    def reserve(self, key: str):
+        self.taken.add(key.lower())
+
+    def __contains__(self, key: str) -> bool:
+        return key.lower() in self.taken
+
+    def allocate(self, key: str) -> str:
+        '''Return key (or key with the next free letter suffix) and reserve it.'''
+        with self._lock:
+            base = key.lower()
+            if base not in self.taken:
+                self.taken.add(base)
+                return key
+            n = self._next.get(base, 0)
+            while f'{base}{_letters(n)}' in self.taken:
+                n += 1
+            self._next[base] = n + 1
+            suffix = _letters(n)
+            self.taken.add(f'{base}{suffix}')
+            return f'{key}{suffix}'
+
+
+class LibraryIndex:
+    '''Hashed DOI, citekey and title lookups over a bibtexparser Library.
+
+    Build it once from the library and call add() for every entry added
+    afterwards; all lookups are O(1).'''
+
+    def __init__(self, library=None):
+        self.dois = {}                   # normalized doi -> citekey
+        self.citekeys = {}               # lower-case citekey -> citekey
+        self.titles = defaultdict(list)  # normalized title -> [citekeys]
+        self.allocator = CitekeyAllocator()
+        if library is not None:
+            for entry in library.entries:
+                self.add(entry)
+            logger.debug(f"Indexed {len(self.citekeys)} entries, {len(self.dois)} DOIs.")
+
+    def add(self, entry):
+        self.add_key(entry.key, doi=_field(entry, 'doi'), title=_field(entry, 'title'))
+
+    def add_key(self, key: str, doi: str = '', title: str = ''):
+        '''Index a citekey with its DOI and title without needing a parsed entry.'''
+        self.citekeys[key.lower()] = key
+        self.allocator.reserve(key)
+        if doi:
+            self.dois.setdefault(normalize_doi(doi), key)
+        title = normalize_title(title)
+        if title:
+            self.titles[title].append(key)
+
+    def has_doi(self, doi) -> bool:
+        return normalize_doi(doi) in self.dois
+
+    def key_for_doi(self, doi):
+        return self.dois.get(normalize_doi(doi))
+
+    def has_citekey(self, key: str) -> bool:
+        return key.lower() in self.citekeys
+
+    def keys_for_title(self, title) -> list:
+        return self.titles.get(normalize_title(title), [])
+
+    def unique_key(self, key: str) -> str:
+        '''Return a citekey based on key that is not in the library yet (and reserve it).'''
+        return self.allocator.allocate(key)
+
+    def __len__(self):
+        return len(self.citekeys)
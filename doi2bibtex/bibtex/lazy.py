@@ -0,0 +1,164 @@
+import os
+import re
+import mmap
+import shutil
+import tempfile
+import bibtexparser
+from doi2bibtex.util.getdoilogger import return_logger as getlogger
+from .read import layers, load_bib, BLOCKHEADER
+from .index import LibraryIndex
+
+logger = getlogger(__name__)
+
+BLOCKSTART = re.compile(BLOCKHEADER.encode('ascii'), re.MULTILINE)
+HEADER = re.compile(rb'[ \t]*@[ \t]*(\w+)[ \t]*[{(]\s*([^,\s{}()]+)\s*,')
+DOIFIELD = re.compile(rb'\bdoi\s*=\s*[{"]\s*([^}"\s]+)', re.IGNORECASE)
+TITLEFIELD = re.compile(rb'\btitle\s*=\s*[{"]([^\n]*)', re.IGNORECASE)
+NOTENTRIES = (b'comment', b'string', b'preamble')
+
+
+class LazyLibrary:
+    '''A .bib file that is indexed up front and parsed one block at a time.
+
+    Opening only scans the (memory-mapped) file for where each @type{key,
+    block starts and what its DOI is. A block is parsed, with the same
+    middleware as load_bib, the first time it is asked for. write() copies
+    every block that was not replaced byte-for-byte and appends new entries.
+
+    Parsed entries are copies: changes only reach the file through
+    replace(). @string macros are kept but not expanded in lazily parsed
+    blocks; use materialize() for a regular, fully parsed Library.'''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.blocks = []      # [start, end, key or None]
+        self.keys = {}        # lower-case citekey -> block number
+        self.dois = {}        # block number -> doi
+        self.titles = {}      # block number -> raw title line
+        self.parsed = {}      # block number -> Entry
+        self.replaced = {}    # block number -> Entry
+        self.new = []
+        self._fh = None
+        self._mm = b''
+        if os.path.exists(path) and os.path.getsize(path):
+            self._fh = open(path, 'rb')
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._scan()
+
+    def _scan(self):
+        mm = self._mm
+        starts = [_m.start() for _m in BLOCKSTART.finditer(mm)]
+        self.head = starts[0] if starts else len(mm)
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else len(mm)
+            key = None
+            header = HEADER.match(mm, start, end)
+            if header and header.group(1).lower() not in NOTENTRIES:
+                key = header.group(2).decode('utf-8', errors='replace')
+                self.keys.setdefault(key.lower(), i)
+                doi = DOIFIELD.search(mm, start, end)
+                if doi:
+                    self.dois[i] = doi.group(1).decode('utf-8', errors='replace')
+                title = TITLEFIELD.search(mm, start, end)
+                if title:
+                    self.titles[i] = title.group(1).decode('utf-8', errors='replace')
+            self.blocks.append((start, end, key))
+        logger.debug(f"Indexed {len(self.keys)} entries in {len(self.blocks)} blocks of {self.path}.")
+
+    def _raw(self, i: int) -> str:
+        start, end, _ = self.blocks[i]
+        return self._mm[start:end].decode('utf-8', errors='replace')
+
+    def _parse(self, i: int):
+        if i in self.replaced:
+            return self.replaced[i]
+        if i not in self.parsed:
+            _lib = bibtexparser.parse_string(self._raw(i), append_middleware=layers)
+            self.parsed[i] = _lib.entries[0] if _lib.entries else None
+            if self.parsed[i] is None:
+                logger.warning(f"Could not parse block {self.blocks[i][2]} in {self.path}.")
+        return self.parsed[i]
+
+    def get(self, key: str):
+        '''Return the (parsed) entry for key, or None.'''
+        i = self.keys.get(key.lower())
+        if i is not None:
+            return self._parse(i)
+        for entry in self.new:
+            if entry.key.lower() == key.lower():
+                return entry
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.keys) + len(self.new)
+
+    @property
+    def entries(self):
+        '''Every entry, parsing whatever has not been parsed yet.'''
+        _entries = [self._parse(i) for i in sorted(self.keys.values())]
+        return [entry for entry in _entries if entry is not None] + self.new
+
+    def add(self, entry):
+        self.new.append(entry)
+
+    def replace(self, entry):
+        '''Replace the stored block with the same citekey as entry.'''
+        i = self.keys.get(entry.key.lower())
+        if i is None:
+            self.add(entry)
+        else:
+            self.replaced[i] = entry
+
+    def build_index(self) -> LibraryIndex:
+        '''LibraryIndex of the library without parsing any block.'''
+        index = LibraryIndex()
+        for i, (_, _, key) in enumerate(self.blocks):
+            if key is not None:
+                index.add_key(key, doi=self.dois.get(i, ''), title=self.titles.get(i, ''))
+        for entry in self.new:
+            index.add(entry)
+        return index
+
+    def materialize(self):
+        '''Fully parse the file into a regular bibtexparser Library with all changes applied.'''
+        library = load_bib(self.path) if self.blocks else bibtexparser.Library()
+        for i, entry in self.replaced.items():
+            library.replace(library.entries_dict[self.blocks[i][2]], entry)
+        library.add(self.new)
+        return library
+
+    def write(self, path: str, render):
+        '''Write the library to path; render turns a list of entries into BibTeX.'''
+        _dir = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('wb', dir=_dir, delete=False) as fh:
+            last = self._mm[:self.head] if self.blocks else self._mm[:]
+            fh.write(last)
+            for i, (start, end, _) in enumerate(self.blocks):
+                if i in self.replaced:
+                    last = render([self.replaced[i]]).strip('\n').encode('utf-8') + b'\n\n'
+                else:
+                    last = self._mm[start:end]
+                fh.write(last)
+            if self.new:
+                # Leave exactly one blank line before the new entries
+                if last.strip():
+                    fh.write(b'\n' * max(0, 2 - (len(last) - len(last.rstrip(b'\n')))))
+                fh.write(render(self.new).strip('\n').encode('utf-8') + b'\n')
+        if os.path.exists(path):
+            shutil.copymode(path, fh.name)
+        # Release the map first, path may be the file it maps
+        self.close()
+        os.replace(fh.name, path)
+
+    def close(self):
+        if self._fh is not None:
+            self._mm.close()
+            self._fh.close()
+            self._fh = None
+
+
+def load_lazy(path: str) -> LazyLibrary:
+    return LazyLibrary(path)
@@ -8,16 +8,18 @@ import traceback
 from urllib.parse import urlencode
 import httpx
 import random
-from asyncio_throttle import Throttler
 from doi2bibtex.util.getdoilogger import return_logger as getlogger
+from doi2bibtex.util.httpclient import get_client
+from doi2bibtex.util.doicache import get_doicache
+from doi2bibtex.util.singleflight import singleflight, doi_key
 from colorama import Fore, Style
 
 BASE_URL = 'https://api.openalex.org/works'
+PER_PAGE = 200    # Largest page OpenAlex will return
+BATCH_SIZE = 50   # Most values OpenAlex accepts in one OR-filter
 
 logger = getlogger(__name__)
 
-throttler = Throttler(rate_limit=10, period=1)  # 10 requests per second (OpenAlex limit)
-
 failures = []
 
 def get_failures():
@@ -31,9 +33,13 @@ async def async_get_works_by(id, **kwargs):
         id = f'doi:{id}'
 
     params = {}
+    id_part = ''
     if kwargs.get('cites', False):
         params['filter'] = f'cites:{id}'
-        params['per-page'] = 200
+        params['per-page'] = PER_PAGE
+    elif kwargs.get('filter', None) is not None:
+        params['filter'] = kwargs['filter']
+        params['per-page'] = PER_PAGE
     else:
         id_part = f"/{id}"
     if kwargs.get('select', None) is not None:
@@ -43,21 +49,23 @@ async def async_get_works_by(id, **kwargs):
 
     works = []
     cursor = "*"
+    client = kwargs.get('client') or get_client()
+
+    while cursor:
+        current_params = params.copy()
+        current_params['cursor'] = cursor
+        url = f"{BASE_URL}{id_part}?" + urlencode(current_params)
 
-    async with httpx.AsyncClient() as client:
-        while cursor:
-            current_params = params.copy()
-            current_params['cursor'] = cursor
-            url = f"{BASE_URL}{id_part if not kwargs.get('cites', False) else ''}?" + urlencode(current_params)
-
-            try:
-                work = await _async_get_url(client, url)
-                works.append(work)
-                cursor = work.get('meta', {}).get('next_cursor')
-                logger.debug(f'Getting next cursor {cursor}')
-            except (httpx.HTTPError, ValueError) as e:
-                logger.error(f"Error fetching {url}: {e}")
-                break  # Stop fetching on error
+        try:
+            work = await _async_get_url(client, url)
+            works.append(work)
+            cursor = work.get('meta', {}).get('next_cursor')
+            if 'per-page' in params and len(work.get('results', [])) < params['per-page']:
+                cursor = None  # Short page, don't spend a request on an empty one
+            logger.debug(f'Getting next cursor {cursor}')
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching {url}: {e}")
+            break  # Stop fetching on error
 
     return works
 
@@ -116,45 +124,76 @@ async def _async_get_url(client, url, retries: int = 5, timeout: float = 10.0):
             return {}
 
 
-async def async_get_cited(dois: List[str]) -> List[str]:
-    _dois = []
+async def async_get_cited(dois: List[str], client: httpx.AsyncClient = None) -> List[str]:
+    """Return dois plus the DOIs of every work they reference.
+
+    Seeds and referenced works are both resolved BATCH_SIZE at a time with
+    OR-filters, and referenced works shared by several seeds are fetched once."""
+    if get_doicache().offline:
+        logger.warning("Cannot look up cited works in offline mode.")
+        return dois
+    ids = {}  # OpenAlex ids of referenced works, deduplicated in order
+
+    def collect(works):
+        for page in works:
+            # A single work is returned as is, a filter returns pages of results
+            for work in page.get('results', [page]):
+                for id in work.get('referenced_works', []):
+                    ids.setdefault(id.replace('https://openalex.org/', ''), None)
+
+    def fetch_references(batch):
+        return async_get_works_by(None, filter='doi:' + '|'.join(batch),
+                                  select='referenced_works', client=client)
+
+    seeds = [str(doi, encoding='utf-8') if isinstance(doi, bytes) else doi for doi in dois if doi]
+    # These would break the OR-filter, fetch them one at a time
+    single = [doi for doi in seeds if '|' in doi or ',' in doi]
+    seeds = [doi for doi in seeds if doi not in single]
+    tasks = [fetch_references(seeds[i:i + BATCH_SIZE]) for i in range(0, len(seeds), BATCH_SIZE)]
+    tasks += [async_get_works_by(doi, select='referenced_works', doi=True, client=client) for doi in single]
+    # Gathered in order, so referenced works keep their order
+    for works in await asyncio.gather(*tasks):
+        collect(works or [])
+
+    logger.debug(f"Resolving {len(ids)} referenced works to DOIs.")
+    id_to_doi = await async_get_dois_from_ids(list(ids), client=client)
+    _dois = [id_to_doi[id] for id in ids if id_to_doi.get(id)]
 
-    async def process_doi(doi):
-        if not doi:
-            return
-        async with throttler:
-            works = await async_get_works_by(doi, select='referenced_works', doi=True)
-        if works:
-            for work in works:
-                ids = work.get('referenced_works', [])
-                for id in ids:
-                    async with throttler:
-                        _doid = await async_get_works_by(id.replace('https://openalex.org/', ''), select='doi')
-                    if _doid and _doid[0].get('doi'):
-                        _doi = _doid[0]['doi'].replace('https://doi.org/', '')
-                        if _doi:
-                            _dois.append(_doi)
+    return dois + _dois
 
-    tasks = [process_doi(doi) for doi in dois]
+async def async_get_dois_from_ids(ids: List[str], client: httpx.AsyncClient = None) -> dict:
+    """Map OpenAlex work ids (W123...) to DOIs using the openalex_id:W1|W2 OR-filter."""
+    id_to_doi = {}
+
+    async def fetch_batch(batch):
+        works = await async_get_works_by(None, filter='openalex_id:' + '|'.join(batch),
+                                         select='id,doi', client=client)
+        for page in works:
+            for work in page.get('results', []):
+                _doi = (work.get('doi') or '').replace('https://doi.org/', '')
+                if _doi:
+                    id_to_doi[work.get('id', '').replace('https://openalex.org/', '')] = _doi
+
+    ids = list(dict.fromkeys(ids))
+    tasks = [fetch_batch(ids[i:i + BATCH_SIZE]) for i in range(0, len(ids), BATCH_SIZE)]
     await asyncio.gather(*tasks)
+    return id_to_doi
 
-    return dois + _dois
-
-async def async_get_citing(dois: List[str]) -> List[str]:
+async def async_get_citing(dois: List[str], client: httpx.AsyncClient = None) -> List[str]:
+    if get_doicache().offline:
+        logger.warning("Cannot look up citing works in offline mode.")
+        return dois
     works = []
     _dois = []
     results = []
-    throttler = Throttler(rate_limit=5, period=1)  # 5 requests per second (adjust as needed)
 
     async def fetch_doi(doi):
         if not doi:
             return
-        async with throttler:
-            _id = await async_get_works_by(doi, select='id', doi=True)
+        _id = await async_get_works_by(doi, select='id', doi=True, client=client)
         if _id:
             id = _id[0].get('id', '').replace('https://openalex.org/', '')
-            async with throttler:
-                citing_works = await async_get_works_by(id, select='doi', cites=True)
+            citing_works = await async_get_works_by(id, select='doi', cites=True, client=client)
             results.append(citing_works)
 
     tasks = [fetch_doi(doi) for doi in dois]
@@ -171,7 +210,64 @@ async def async_get_citing(dois: List[str]) -> List[str]:
 
     return dois + _dois
 
-def worktometadata(work, doi=''):
+# Metadata key -> OpenAlex work fields needed to build it
+METADATA_FIELDS = {
+    'doi': ('doi',),
+    'title': ('title',),
+    'abstract': ('abstract_inverted_index',),
+    'publication_date': ('publication_date',),
+    'publication_year': ('publication_year',),
+    'type': ('type',),
+    'language': ('language',),
+    'primary_location': ('primary_location',),
+    'open_access': ('open_access',),
+    'authorships': ('authorships',),
+    'cited_by_count': ('cited_by_count',),
+    'biblio': ('biblio',),
+    'is_retracted': ('is_retracted',),
+    'is_paratext': ('is_paratext',),
+    'concepts': ('concepts',),
+    'mesh': ('mesh',),
+    'keywords': ('keywords',),
+    'grants': ('grants',),
+    'referenced_works_count': ('referenced_works_count',),
+    'related_works': ('related_works',),
+    'sustainable_development_goals': ('sustainable_development_goals',),
+    'openalex_id': ('id',),
+    'openalex_url': ('id',),
+}
+
+consumers = {}  # name -> metadata keys that consumer reads
+
+def register_fields(consumer: str, fields):
+    """Declare the metadata keys a consumer reads so fetches can select= only those.
+
+    Until something registers, metadata lookups fetch the full work."""
+    unknown = set(fields) - set(METADATA_FIELDS)
+    if unknown:
+        raise KeyError(f"Unknown metadata fields {sorted(unknown)} for {consumer}")
+    consumers[consumer] = tuple(fields)
+
+def required_fields():
+    """Union of all registered metadata keys (None means everything)."""
+    if not consumers:
+        return None
+    fields = {'doi'}  # Always needed to map batched results back to DOIs
+    for _fields in consumers.values():
+        fields.update(_fields)
+    return tuple(sorted(fields))
+
+def select_for(fields) -> str:
+    """Build the select= value for a set of metadata keys."""
+    if fields is None:
+        return None
+    return ','.join(sorted({_f for key in fields for _f in METADATA_FIELDS[key]}))
+
+def _has_fields(metadata, fields):
+    return fields is None or all(key in metadata for key in fields)
+
+def worktometadata(work, doi='', fields=None):
+    """Convert an OpenAlex work to the metadata dict, keeping only fields if given."""
     metadata = {
     'doi': doi,
     'title': work.get('title'),
@@ -203,20 +299,41 @@ def worktometadata(work, doi=''):
     'openalex_id': work.get('id'),
     'openalex_url': f"https://openalex.org/{work.get('id', '').split('/')[-1]}"
     }
+    if fields is not None:
+        metadata = {key: metadata[key] for key in fields}
     return metadata
 
-async def async_get_metadata_from_doi(doi):
+def _metadata_key(doi, client=None, fields=None):
+    key = doi_key(doi)
+    return key and (key, tuple(sorted(fields)) if fields is not None else None)
+
+@singleflight(_metadata_key)
+async def async_get_metadata_from_doi(doi, client: httpx.AsyncClient = None, fields=None):
+    if fields is None:
+        fields = required_fields()
+    cache = get_doicache()
+    metadata = cache.get('metadata', doi)
+    if metadata is not None and _has_fields(metadata, fields):
+        return metadata
     metadata = {}
+    if cache.offline:
+        logger.debug(f"No cached metadata for {doi} (offline mode).")
+        return metadata
+    if cache.get('miss', doi):
+        logger.debug(f"OpenAlex recently had no metadata for {doi}.")
+        return metadata
     try:
-        # Fetch full work data (no select parameter means all fields)
-        works = await async_get_works_by(doi, doi=True)
+        # Only fetch the fields registered consumers read (no select means all fields)
+        works = await async_get_works_by(doi, doi=True, select=select_for(fields), client=client)
         
         if works and len(works) > 0:
             work = works[0]
             # Extract relevant metadata
-            metadata = worktometadata(work, doi)
+            metadata = worktometadata(work, doi, fields)
+            cache.put('metadata', doi, metadata)
         else:
-            logger.warning(f"No metadata found for DOI: {doi}")            
+            logger.warning(f"No metadata found for DOI: {doi}")
+            cache.put('miss', doi, True)
     except Exception as e:
         logger.debug(f"Error fetching metadata for DOI {doi}: {e}")
         # stack_trace_str = traceback.format_exc()
@@ -224,47 +341,72 @@ async def async_get_metadata_from_doi(doi):
     finally:
         return metadata
                 
-async def async_get_metadata_from_dois(dois: List[str]) -> dict:
+async def async_get_metadata_from_dois(dois: List[str], client: httpx.AsyncClient = None,
+                                       fields=None) -> dict:
     """
     Fetch metadata including abstracts for a list of DOIs from OpenAlex.
+
+    DOIs are looked up BATCH_SIZE at a time with the doi:a|b|c OR-filter, so
+    a thousand DOIs cost twenty requests instead of a thousand.
     
     Args:
         dois: List of DOI strings (without https://doi.org/ prefix)
+        client: Optional shared httpx.AsyncClient (defaults to the pooled client)
+        fields: Metadata keys to fetch (defaults to what registered consumers need)
         
     Returns:
-        Dictionary mapping DOIs to their metadata dictionaries
+        Dictionary mapping DOIs to their metadata dictionaries (None if not found)
     """
+    if fields is None:
+        fields = required_fields()
+    cache = get_doicache()
     metadata_dict = {}
-    
-    async def fetch_doi_metadata(doi):
+    pending = {}
+    answered = set()  # Lowercased DOIs of the batches OpenAlex answered
+    for doi in dois:
         if not doi:
+            continue
+        if isinstance(doi, bytes):
+            doi = str(doi, encoding='utf-8')
+        metadata = cache.get('metadata', doi)
+        if metadata is not None and _has_fields(metadata, fields):
+            metadata_dict[doi] = metadata
+        elif cache.offline or cache.get('miss', doi):
+            metadata_dict[doi] = None
+        elif '|' in doi or ',' in doi:
+            # These would break the OR-filter, fetch them one at a time
+            metadata_dict[doi] = await async_get_metadata_from_doi(doi, client=client, fields=fields) or None
+        else:
+            pending.setdefault(doi.lower(), doi)
+
+    async def fetch_batch(batch):
+        _filter = 'doi:' + '|'.join(batch)
+        try:
+            works = await async_get_works_by(None, filter=_filter, select=select_for(fields),
+                                             client=client)
+        except Exception as e:
+            logger.error(f"Exception fetching metadata for {len(batch)} DOIs: {e}")
             return
-            
-        async with throttler:
-            try:
-                # Fetch full work data (no select parameter means all fields)
-                works = await async_get_works_by(doi, doi=True)
-                
-                if works and len(works) > 0:
-                    work = works[0]
-                    
-                    # Extract relevant metadata
-                    metadata = worktometadata(work)
-                    
-                    metadata_dict[doi] = metadata
-                else:
-                    logger.warning(f"No metadata found for DOI: {doi}")
-                    metadata_dict[doi] = None
-                    
-            except Exception as e:
-                logger.error(f"Exception fetching metadata for DOI {doi}: {e}")
-                metadata_dict[doi] = None
-    
-    # Create tasks for all DOIs
-    tasks = [fetch_doi_metadata(doi) for doi in dois]
-    
-    # Execute all tasks concurrently
+        answered.update(batch)
+        for page in works:
+            for work in page.get('results', []):
+                _doi = (work.get('doi') or '').replace('https://doi.org/', '').lower()
+                if _doi not in pending:
+                    continue
+                doi = pending[_doi]
+                metadata_dict[doi] = worktometadata(work, doi, fields)
+                cache.put('metadata', doi, metadata_dict[doi])
+
+    keys = list(pending)
+    tasks = [fetch_batch(keys[i:i + BATCH_SIZE]) for i in range(0, len(keys), BATCH_SIZE)]
     await asyncio.gather(*tasks)
+
+    for _doi, doi in pending.items():
+        if doi not in metadata_dict:
+            logger.warning(f"No metadata found for DOI: {doi}")
+            metadata_dict[doi] = None
+            if _doi in answered:  # Not when the request failed
+                cache.put('miss', doi, True)
     
     return metadata_dict
 
@@ -0,0 +1,78 @@
+import asyncio
+from itertools import islice
+from typing import Callable, Iterable
+import httpx
+from doi2bibtex.util.getdoilogger import return_logger
+from doi2bibtex.util.doicache import get_doicache
+from .openalex import async_get_metadata_from_dois, BATCH_SIZE
+from .bibtexfromdoi import async_get_bibtex_from_url, async_get_crossref_works, CROSSREF_BATCH
+
+logger = return_logger(__name__)
+
+WORKERS = 8
+
+
+async def resolve_dois(dois: Iterable[str], on_result: Callable[[str, str], None],
+                       client: httpx.AsyncClient = None, workers: int = WORKERS,
+                       queue_size: int = 0, progress: Callable[[], None] = None,
+                       backend: str = 'doi'):
+    """
+    Resolve DOIs to BibTeX with a bounded producer/consumer pipeline.
+
+    The producer pulls BATCH_SIZE DOIs at a time from dois, fetches their
+    OpenAlex metadata in one request and queues them; a fixed pool of
+    workers resolves queued DOIs and hands each result to on_result as
+    soon as it arrives. The queue is bounded, so the producer stalls
+    when workers fall behind and memory stays flat however many DOIs
+    there are.
+
+    With backend='crossref' the producer also looks each batch up on the
+    Crossref REST API (CROSSREF_BATCH DOIs per request) and workers render
+    those records locally; only DOIs Crossref does not have go through
+    doi.org content negotiation.
+
+    Args:
+        dois: DOIs to resolve (any iterable, it is consumed lazily)
+        on_result: Called with (doi, bibtex) for every DOI; bibtex is '' on failure
+        client: Optional shared httpx.AsyncClient (defaults to the pooled client)
+        workers: Number of concurrent resolvers
+        queue_size: Maximum queued DOIs (defaults to twice the batch size)
+        progress: Optional callable invoked once per finished DOI
+        backend: 'doi' (content negotiation) or 'crossref' (bulk REST lookups)
+    """
+    batch_size = CROSSREF_BATCH if backend == 'crossref' else BATCH_SIZE
+    queue = asyncio.Queue(maxsize=queue_size or 2 * batch_size)
+    dois = iter(dois)
+    cache = get_doicache()
+
+    async def crossref(batch):
+        if backend != 'crossref':
+            return {}
+        return await async_get_crossref_works([doi for doi in batch
+                                               if cache.get('record', doi) is None],
+                                              client=client)
+
+    async def produce():
+        try:
+            while batch := list(islice(dois, batch_size)):
+                metadata, works = await asyncio.gather(
+                    async_get_metadata_from_dois(batch, client=client), crossref(batch))
+                for doi in batch:
+                    await queue.put((doi, metadata.get(doi) or {}, works.get(doi.lower())))
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
+
+    async def consume():
+        while (item := await queue.get()) is not None:
+            doi, metadata, csl = item
+            try:
+                result = await async_get_bibtex_from_url(doi, metadata, client=client, csl=csl)
+            except Exception as e:
+                logger.error(f"Error resolving {doi}: {e}")
+                result = ''
+            on_result(doi, result)
+            if progress is not None:
+                progress()
+
+    await asyncio.gather(produce(), *[consume() for _ in range(workers)])
@@ -1,9 +1,13 @@
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 import bibtexparser
 import bibtexparser.middlewares as m
+from bibtexparser.model import ParsingFailedBlock, DuplicateBlockKeyBlock
 # from .month import MonthIntStrMiddleware
 from doi2bibtex.util.getdoilogger import return_logger as getlogger
 from .dedupe import dedupe_bib_library
+from . import snapshot
 
 logger = getlogger(__name__)
 
@@ -12,12 +16,106 @@ layers = [
     m.MonthIntMiddleware(True)
 ]
 
-def load_bib(bibtex, dedupe=False):
+# Files bigger than this are split at entry boundaries and parsed in a process pool
+PARALLEL_BYTES = 2 * 1024 * 1024
+CHUNKS_PER_WORKER = 4
+# Only real block headers, not lines of a field value that happen to start with @
+# (shared with lazy.py, which scans bytes)
+BLOCKHEADER = r'^[ \t]*@\w+\s*[{(]'
+BLOCKSTART = re.compile(BLOCKHEADER, re.MULTILINE)
+STRINGSTART = re.compile(r'^[ \t]*@string\s*[{(]', re.MULTILINE | re.IGNORECASE)
+
+
+def _parse_chunk(prefix, nprefix, chunk, line_offset):
+    '''Parse one chunk (in a worker) and return its blocks ready to be pickled back.'''
+    _lib = bibtexparser.parse_string(prefix + chunk, append_middleware=layers)
+    blocks = []
+    for block in _lib.blocks[nprefix:]:
+        if isinstance(block, DuplicateBlockKeyBlock):
+            # Re-detected when the chunks are merged
+            block = block.ignore_error_block
+        elif isinstance(block, ParsingFailedBlock):
+            # Parser exceptions do not survive pickling
+            block = ParsingFailedBlock(Exception(str(block.error)), block.start_line, block.raw,
+                                       block.ignore_error_block)
+        if block.start_line is not None:
+            block._start_line_in_file = block.start_line + line_offset
+        blocks.append(block)
+    return blocks
+
+
+def _string_span(text, start):
+    '''Return the end of the @string block at start, just past its closing delimiter.'''
+    opening = STRINGSTART.match(text, start).end() - 1
+    closing = '}' if text[opening] == '{' else ')'
+    depth = 0
+    for i in range(opening, len(text)):
+        if text[i] == text[opening]:
+            depth += 1
+        elif text[i] == closing:
+            depth -= 1
+            if not depth:
+                return i + 1
+    return len(text)
+
+
+def _chunks(text, parts):
+    '''Yield (chunk, first line) pieces of text, cut only where a block starts.'''
+    size = max(1, len(text) // parts)
+    start, line = 0, 0
+    while start < len(text):
+        _next = BLOCKSTART.search(text, start + size)
+        end = _next.start() if _next else len(text)
+        yield text[start:end], line
+        line += text.count('\n', start, end)
+        start = end
+
+
+def load_bib_parallel(path, workers=None):
+    '''Parse a .bib file in chunks across a process pool, merging the blocks in file order.
+
+    @string definitions are prepended to every chunk so references to
+    them still resolve; failed blocks are kept just like in load_bib.'''
+    workers = workers or os.cpu_count() or 1
+    with open(path, encoding='utf-8') as fh:
+        text = fh.read()
+    # Only the @string blocks themselves, not comments or anything else around them
+    prefix = ''.join(text[_m.start():_string_span(text, _m.start())].strip() + '\n'
+                     for _m in STRINGSTART.finditer(text))
+    # Drop exactly as many blocks as the prefix parses into
+    nprefix = len(bibtexparser.parse_string(prefix).blocks) if prefix else 0
+    lines = []
+    chunks = []
+    for chunk, line in _chunks(text, workers * CHUNKS_PER_WORKER):
+        chunks.append(chunk)
+        lines.append(line - prefix.count('\n'))
+    logger.debug(f"Parsing {path} in {len(chunks)} chunks on {workers} processes.")
+    library = bibtexparser.Library()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for blocks in pool.map(_parse_chunk, [prefix] * len(chunks), [nprefix] * len(chunks),
+                               chunks, lines):
+            library.add(blocks, fail_on_duplicate_key=False)
+    return library
+
+
+def _parse_file(path, workers=None):
+    if os.path.getsize(path) > PARALLEL_BYTES and (workers or os.cpu_count() or 1) > 1:
+        try:
+            return load_bib_parallel(path, workers)
+        except Exception as e:
+            logger.warning(f"Parallel parsing failed ({e}), parsing {path} serially.")
+    return bibtexparser.parse_file(path, append_middleware=layers)
+
+
+def load_bib(bibtex, dedupe=False, workers=None):
     logger.debug(f"Loading bib with dedupe={dedupe}")
     library = bibtexparser.parse_string('')
     try:
         if os.path.exists(bibtex):
-            library = bibtexparser.parse_file(bibtex, append_middleware=layers)
+            library = snapshot.load(bibtex)
+            if library is None:
+                library = _parse_file(bibtex, workers)
+                snapshot.save(bibtex, library)
         else:
             library = bibtexparser.parse_string(bibtex, append_middleware=layers)
         if dedupe:
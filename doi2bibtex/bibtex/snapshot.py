@@ -0,0 +1,99 @@
+'''Snapshots of parsed libraries so unchanged .bib files are not parsed again'''
+import os
+import pickle
+import hashlib
+import bibtexparser
+from bibtexparser.model import Entry, Field, String, ParsingFailedBlock, DuplicateBlockKeyBlock
+from doi2bibtex.util.cache import CACHEDIR
+from doi2bibtex.util.getdoilogger import return_logger as getlogger
+
+logger = getlogger(__name__)
+
+SNAPSHOTDIR = os.path.join(CACHEDIR, 'doi2bibtex_snapshots')
+# Bump when the snapshot layout or the parse middleware changes
+VERSION = (1, bibtexparser.__version__)
+MIN_BYTES = 256 * 1024  # Smaller files parse faster than a snapshot is checked
+
+
+def _snapshot_path(path: str) -> str:
+    return os.path.join(SNAPSHOTDIR, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest() + '.pickle')
+
+
+def _file_hash(path: str) -> str:
+    sha = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _pack(block, raw=None):
+    '''Entries and strings as plain tuples (small and quick to unpickle), anything else as is.'''
+    if isinstance(block, Entry):
+        return ('e', block.entry_type, block.key,
+                [(_f.key, _f.value, _f.enclosing) for _f in block.fields], block.start_line, raw)
+    if isinstance(block, String):
+        return ('s', block.key, block.value, block.start_line, block.raw)
+    if isinstance(block, DuplicateBlockKeyBlock):
+        # Library.add turns it back into a duplicate, which needs its raw text to be written
+        return _pack(block.ignore_error_block, raw=block.raw)
+    if isinstance(block, ParsingFailedBlock):
+        return ('f', str(block.error), block.start_line, block.raw)
+    return ('b', block)
+
+
+def _unpack(packed):
+    kind = packed[0]
+    if kind == 'e':
+        _, entry_type, key, fields, start_line, raw = packed
+        return Entry(entry_type, key, [Field(_k, _v, enclosing=_e) for _k, _v, _e in fields],
+                     start_line=start_line, raw=raw)
+    if kind == 's':
+        _, key, value, start_line, raw = packed
+        return String(key, value, start_line=start_line, raw=raw)
+    if kind == 'f':
+        _, error, start_line, raw = packed
+        return ParsingFailedBlock(Exception(error), start_line=start_line, raw=raw)
+    return packed[1]
+
+
+def load(path: str):
+    '''Return the snapshot of path as a Library if the file is unchanged, else None.'''
+    if os.path.getsize(path) < MIN_BYTES or not os.path.exists(_snapshot_path(path)):
+        return None
+    try:
+        with open(_snapshot_path(path), 'rb') as fh:
+            snapshot = pickle.load(fh)
+        stat = os.stat(path)
+        if snapshot['version'] != VERSION or snapshot['size'] != stat.st_size:
+            return None
+        if snapshot['mtime'] != stat.st_mtime_ns and snapshot['hash'] != _file_hash(path):
+            return None
+        library = bibtexparser.Library()
+        library.add([_unpack(_b) for _b in snapshot['blocks']], fail_on_duplicate_key=False)
+    except Exception as e:
+        logger.debug(f"Ignoring snapshot of {path}: {e}")
+        return None
+    logger.debug(f"Loaded {len(library.entries)} entries of {path} from snapshot.")
+    return library
+
+
+def save(path: str, library):
+    '''Store a snapshot of the freshly parsed library for path.'''
+    if os.path.getsize(path) < MIN_BYTES:
+        return
+    try:
+        stat = os.stat(path)
+        snapshot = {'version': VERSION,
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime_ns,
+                    'hash': _file_hash(path),
+                    'blocks': [_pack(_b) for _b in library.blocks]}
+        os.makedirs(SNAPSHOTDIR, exist_ok=True)
+        _tmp = _snapshot_path(path) + '.tmp'
+        with open(_tmp, 'wb') as fh:
+            pickle.dump(snapshot, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(_tmp, _snapshot_path(path))
+        logger.debug(f"Saved snapshot of {path}.")
+    except Exception as e:
+        logger.debug(f"Could not save snapshot of {path}: {e}")
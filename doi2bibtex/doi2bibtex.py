@@ -3,7 +3,6 @@
 
 import sys
 import asyncio
-from asyncio_throttle import Throttler
 import doi2bibtex.opts as opts
 import doi2bibtex.util as util
 import doi2bibtex.bibtex as bibtex
@@ -13,7 +12,7 @@ import doi2bibtex.web_app as web_app
 from doi2bibtex.tex import cites
 from doi2bibtex.llm import config_cli
 from rich.console import Console
-from tqdm.asyncio import tqdm_asyncio
+from tqdm import tqdm
 import logging
 from contextlib import contextmanager
 
@@ -49,6 +48,10 @@ async def async_main():
     logger = util.getlogger('doi2bib', root=True, loglevel=args.loglevel)
     
     logger.debug("Debug logging enabled.")
+    util.configure_http(max_connections=args.max_connections,
+                        keepalive_expiry=args.keepalive,
+                        http2=False if args.no_http2 else None)
+    util.configure_doicache(offline=args.offline, refresh=args.refresh)
     if args.outputmode == 'webserver':
         logger.info(f"Starting server on {args.addr}:{args.port}")
         await web_app.web_server(args.addr, args.port)
@@ -66,7 +69,10 @@ async def async_main():
             cites.check_tex_cites(args.tex_files, args.bibtexdb, use_llm=args.llm, llm_model=args.llm_model)
         sys.exit()
     
-    if args.bibtexdb:
+    if args.bibtexdb and args.lazy:
+        library = bibtex.read_lazy(args.bibtexdb)
+        logger.debug(f"Indexed {len(library)} entries in {args.bibtexdb}.")
+    elif args.bibtexdb:
         library = bibtex.read(args.bibtexdb)
         logger.debug(f"Parsed {len(library.entries)} from {args.bibtexdb}.")
     else:
@@ -77,54 +83,96 @@ async def async_main():
         dois += util.doifinder(args.doifile)
         logger.debug(dois)
     
+    client = util.get_client()
     if args.cited:
-        dois = await bibtex.async_get_cited(dois)
+        dois = await bibtex.async_get_cited(dois, client=client)
     if args.citing:
-        dois = await bibtex.async_get_citing(dois)
+        dois = await bibtex.async_get_citing(dois, client=client)
     
    
     
     added = 0
-    dois_in_library = bibtex.listKeyinLibrary(library, 'doi')
-    citekeys_in_library = bibtex.listCitekeys(library, lower=True)
-    incr = 1
-    doi_throttler = Throttler(rate_limit=5, period=1)
-    alex_throttler = Throttler(rate_limit=3, period=1)
-    async def process_doi(doi):
+    if isinstance(library, bibtex.LazyLibrary):
+        index = library.build_index()
+    else:
+        index = bibtex.LibraryIndex(library)
+    dois = {doi.lower(): doi for doi in filter(None, map(util.doi_from_url, dois))}
+    todo = [doi for key, doi in dois.items() if not index.has_doi(key)]
+    add_entry = library.add
+    if getattr(args, 'stream', False):
+        add_entry = output.open_stream(library, args)
+    journal = None
+    if args.outputmode == 'bibtexdb' and (todo or args.resume):
+        # Only runs that write a .bib can be resumed
+        journal = util.JobJournal.for_output(args.out, resume=args.resume)
+    elif args.resume:
+        logger.warning("--resume only works with the bibtexdb output mode, ignoring.")
+    # Citekeys are handed out in input order, whatever order the results arrive in,
+    # so Smith_2020a/b do not depend on --workers, network timing or --resume
+    order = {doi.lower(): slot for slot, doi in enumerate(todo)}
+    ready = {}
+    released = 0
+    def add_result(doi, result):
         nonlocal added
-        nonlocal incr
-        doi = util.doi_from_url(doi)
-        if not doi:
-            return
-        if doi.lower() in dois_in_library:
-            return
-        async with alex_throttler:
-            metadata = await bibtex.async_get_metadata_from_doi(doi)
-        async with doi_throttler:
-            result = await bibtex.async_get_bibtex_from_url(doi, metadata)
-        if result:
-            try:
-                _entry = bibtex.read(result).entries[0]
-                if _entry.key.lower() in citekeys_in_library:
-                    _entry.key = f"{_entry.key}_{incr}"
-                    incr += 1
-                library.add(_entry)
-                citekeys_in_library.append(_entry.key.lower())
-                added += 1
-            except IndexError:
-                logger.warning(f"Error adding doi: {doi}")
+        try:
+            _entry = bibtex.read(result).entries[0]
+            _entry.key = index.unique_key(_entry.key)
+            add_entry(_entry)
+            index.add(_entry)
+            added += 1
+        except IndexError:
+            logger.warning(f"Error adding doi: {doi}")
+            if journal is not None:
+                journal.fail(doi, 'could not parse BibTeX')
+    def process_result(doi, result, replay=False):
+        nonlocal released
+        if journal is not None and not replay:
+            if result:
+                journal.resolve(doi, result)
+            else:
+                journal.fail(doi, 'no BibTeX returned')
+        ready[order[doi.lower()]] = (doi, result)
+        while released in ready:
+            _doi, _result = ready.pop(released)
+            released += 1
+            if _result:
+                add_result(_doi, _result)
+    if journal is not None:
+        if args.resume:
+            # Restore finished work that never reached the output file, in its own slot
+            wanted = {doi.lower(): doi for doi in todo}
+            restored = set()
+            for doi, result in journal.resolved():
+                doi = wanted.get(doi.lower())
+                if doi is not None and doi not in restored:
+                    restored.add(doi)
+                    process_result(doi, result, replay=True)
+            todo = [doi for doi in todo if doi not in restored]
+            console.print(f"[cyan]Resuming: [bold]{len(restored)}[/bold] DOIs restored from {journal.path}, "
+                          f"[bold]{len(todo)}[/bold] left to resolve.[/cyan]")
+        journal.pending(todo)
     
     with _buffer_logs():        
-        if len(dois) < 10:
+        if len(todo) < 10:
             async with util.Spinner("Resolving: ") as spinner:
-                tasks = [asyncio.create_task(process_doi(doi)) for doi in set(dois)]
-                pending = set(tasks)
+                task = asyncio.create_task(bibtex.resolve_dois(todo, process_result, client=client,
+                                                               workers=args.workers,
+                                                               backend=args.backend))
+                pending = {task}
                 while pending:
                     done, pending = await asyncio.wait(pending, timeout=0.1, return_when=asyncio.FIRST_COMPLETED)
                     await spinner.update()
+                task.result()
         else:
-            tasks = [process_doi(doi) for doi in set(dois)]
-            await tqdm_asyncio.gather(*tasks, desc="Processing dois", colour='blue', unit='bib')
+            with tqdm(total=len(todo), desc="Processing dois", colour='blue', unit='bib') as pbar:
+                await bibtex.resolve_dois(todo, process_result, client=client,
+                                          workers=args.workers, progress=pbar.update,
+                                          backend=args.backend)
+    if journal is not None:
+        journal.close()
+        _failed = journal.summary()[util.jobjournal.FAILED]
+        if _failed:
+            console.print(f"[yellow]{_failed} DOIs failed; rerun with --resume to retry them.[/yellow]")
     if added:
         console.print(f"[cyan]Updated library with [bold]{added}[/bold] DOIs.[/cyan]")
     # Summarize any OpenAlex fetch failures
@@ -136,11 +184,17 @@ async def async_main():
             console.print(f"  • {url}: {msg}")
 
     await getattr(output, args.outputmode)(library, args)
+    if journal is not None and journal.complete():
+        # Nothing failed or was interrupted, so nothing to resume
+        journal.discard()
 
 
-   
+async def _async_main_with_client():
+    async with util.shared_client():
+        await async_main()
+
 def main():
-    asyncio.run(async_main())
+    asyncio.run(_async_main_with_client())
     
 if __name__ == "__main__":
     main()
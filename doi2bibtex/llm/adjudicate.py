@@ -0,0 +1,109 @@
+'''Ask an LLM whether candidate pairs of entries are duplicates, concurrently, in batches, with a persistent cache'''
+import os
+import re
+import pickle
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from doi2bibtex.util.cache import CACHEDIR
+from doi2bibtex.util.httpclient import new_client
+from doi2bibtex.util.getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+VCACHE = os.path.join(CACHEDIR, 'llm_verdicts.cache')
+PAIRS_PER_PROMPT = 8  # Overridden by 'pairs_per_prompt' in the model config
+ANSWER = re.compile(r'^\W*(?:pair\s*)?(\d+)\W+(YES|NO)\b', re.IGNORECASE | re.MULTILINE)
+
+PROMPT = """You are a bibliographic assistant. For each numbered pair of BibTeX entries below, determine if the two entries refer to the same publication. Consider variations in title, author lists, page numbers, and publication venue (e.g., preprint vs. final journal article).
+
+Respond with one line per pair, in the form '<pair number>: YES' or '<pair number>: NO', and nothing else.
+
+{pairs}"""
+
+
+def format_entry(entry):
+    """Formats a bibtex entry into a simple string for the LLM prompt."""
+    details = [f"- Type: {entry.entry_type}", f"- Key: {entry.key}"]
+    for key, value in entry.fields_dict.items():
+        details.append(f"- {key.capitalize()}: {value.value}")
+    return "\n".join(details)
+
+
+def _content_hash(entry) -> str:
+    '''Hash of an entry's type and fields (not its citekey), insensitive to case, spacing and field order.'''
+    fields = sorted((k.lower(), ' '.join(str(v.value).lower().split())) for k, v in entry.fields_dict.items())
+    return hashlib.sha1(repr((entry.entry_type.lower(), fields)).encode('utf-8')).hexdigest()
+
+
+def verdict_key(provider, entry1, entry2) -> str:
+    '''Cache key of a pair for one model, the same whichever way round the pair is.'''
+    hashes = sorted((_content_hash(entry1), _content_hash(entry2)))
+    return hashlib.sha1('|'.join([provider.name] + hashes).encode('utf-8')).hexdigest()
+
+
+def load_verdicts() -> dict:
+    if os.path.exists(VCACHE):
+        try:
+            with open(VCACHE, 'rb') as fh:
+                return pickle.load(fh)
+        except Exception as e:
+            logger.warning(f"Could not read LLM verdict cache {VCACHE}: {e}")
+    return {}
+
+
+def save_verdicts(verdicts: dict):
+    try:
+        with open(VCACHE + '.tmp', 'wb') as fh:
+            pickle.dump(verdicts, fh)
+        os.replace(VCACHE + '.tmp', VCACHE)
+    except OSError as e:
+        logger.warning(f"Could not write LLM verdict cache {VCACHE}: {e}")
+
+
+async def _judge(provider, batch, client, semaphore) -> dict:
+    '''Send one multi-pair prompt and return {index in batch: verdict} for the answers we could read.'''
+    pairs = '\n\n'.join(f"Pair {n + 1}:\nEntry A:\n{format_entry(a)}\nEntry B:\n{format_entry(b)}"
+                        for n, (a, b) in enumerate(batch))
+    async with semaphore:
+        response = await provider.async_get_completion(PROMPT.format(pairs=pairs), client)
+    verdicts = {}
+    for number, answer in ANSWER.findall(response or ''):
+        if 0 < int(number) <= len(batch):
+            verdicts[int(number) - 1] = answer.upper() == 'YES'
+    if len(verdicts) < len(batch):
+        logger.warning(f"{provider.name} answered {len(verdicts)} of {len(batch)} pairs.")
+    return verdicts
+
+
+async def async_adjudicate(provider, pairs) -> list:
+    '''Return a verdict (True: duplicates) for every (entry1, entry2) in pairs.
+
+    Cached verdicts are reused; the rest are sent pairs_per_prompt at a
+    time, with up to provider.concurrency prompts in flight over one
+    pooled client. Pairs the model did not answer count as not duplicates
+    and are asked again next time.'''
+    verdicts = load_verdicts()
+    keys = [verdict_key(provider, a, b) for a, b in pairs]
+    todo = [n for n, key in enumerate(keys) if key not in verdicts]
+    logger.info(f"{len(pairs) - len(todo)} of {len(pairs)} LLM verdicts cached.")
+    if todo:
+        size = max(1, int(provider.config.get('pairs_per_prompt', PAIRS_PER_PROMPT)))
+        batches = [todo[i:i + size] for i in range(0, len(todo), size)]
+        semaphore = asyncio.Semaphore(max(1, provider.concurrency))
+        async with new_client(max_connections=provider.concurrency, timeout=provider.timeout) as client:
+            results = await asyncio.gather(*[_judge(provider, [pairs[n] for n in batch], client, semaphore)
+                                             for batch in batches])
+        for batch, result in zip(batches, results):
+            for i, verdict in result.items():
+                verdicts[keys[batch[i]]] = verdict
+        save_verdicts(verdicts)
+    return [verdicts.get(key, False) for key in keys]
+
+
+def adjudicate(provider, pairs) -> list:
+    '''Synchronous async_adjudicate, safe to call while an event loop is running.'''
+    if not pairs:
+        return []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, async_adjudicate(provider, pairs)).result()
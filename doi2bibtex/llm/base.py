@@ -1,15 +1,66 @@
+import httpx
+
 # --- Base Provider Classes ---
 
 class LLMProvider:
-    """Base class for LLM providers."""
+    """Base class for LLM providers.
+
+    Subclasses describe a request with _request() and read the answer with
+    _parse(); get_completion() and async_get_completion() do the sending."""
+    # Requests one provider may have in flight at once (overridden by 'concurrency' in the config)
+    concurrency = 1
+
     def __init__(self, model_config):
         self.config = model_config
+        self.concurrency = model_config.get('concurrency', self.concurrency)
 
-    def get_completion(self, prompt, **kwargs):
-        """Get completion from the LLM. Must be implemented by subclasses."""
+    @property
+    def name(self):
+        return f"{self.config.get('provider', '')}:{self.config.get('model_name', '')}"
+
+    @property
+    def timeout(self):
+        return self.config.get('timeout', 60)
+
+    def _request(self, prompt):
+        """Return the url, headers and json body for prompt (None if it cannot be sent)."""
         raise NotImplementedError
 
+    def _parse(self, result):
+        """Return the completion text from the decoded json response."""
+        raise NotImplementedError
+
+    def _error(self, e):
+        """Report a failed request."""
+        print(f"An unexpected LLM error occurred: {e}")
+
+    def get_completion(self, prompt, **kwargs):
+        """Get completion from the LLM."""
+        request = self._request(prompt)
+        if request is None:
+            return None
+        try:
+            with httpx.Client(timeout=self.timeout) as client:
+                response = client.post(**request)
+                response.raise_for_status()
+                return self._parse(response.json())
+        except Exception as e:
+            self._error(e)
+            return None
+
+    async def async_get_completion(self, prompt, client: httpx.AsyncClient, **kwargs):
+        """Get completion from the LLM over a shared async client."""
+        request = self._request(prompt)
+        if request is None:
+            return None
+        try:
+            response = await client.post(**request, timeout=self.timeout)
+            response.raise_for_status()
+            return self._parse(response.json())
+        except Exception as e:
+            self._error(e)
+            return None
+
     def test_connection(self):
         """Test the connection to the LLM provider. Must be implemented by subclasses."""
         raise NotImplementedError
-
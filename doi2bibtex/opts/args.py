@@ -1,7 +1,9 @@
 import argcomplete, argparse
+import os
 import sys
 
 OUTPUTCMDS = ('bibtexdb', 'html', 'clipboard', 'textfile')
+DATABASE = 'https://raw.githubusercontent.com/JabRef/abbrv.jabref.org/master/journals/journal_abbreviations_acs.csv'
 
 class MyParser(argparse.ArgumentParser):
     def error(self, message):
@@ -29,11 +31,15 @@ parser.add_argument('--bibtexdb', type=str,
 parser.add_argument('--loglevel', default='warning', choices=('info', 'warning', 'error', 'debug'),
                     help="Set the logging level.")
 parser.add_argument('--refresh', action='store_true', default=False,
-                    help="Refresh cached journal list.")
-parser.add_argument('--database', type=str,
-                    default='https://raw.githubusercontent.com/JabRef/'
-                            'abbrv.jabref.org/master/journals/journal_abbreviations_acs.csv',
-                    help="Databse of journal abbreviations.")
+                    help="Revalidate cached journal lists now and ignore cached DOI records.")
+parser.add_argument('--forget', action='store_true', default=False,
+                    help="Forget remembered journal abbreviation decisions before cleaning.")
+parser.add_argument('--offline', action='store_true', default=False,
+                    help="Only use cached DOI records, OpenAlex metadata and journal lists; "
+                         "do not fetch them (PDF downloads and LLMs still use the network).")
+parser.add_argument('--database', type=str, action='append',
+                    help="Databse of journal abbreviations. You can call this argument more than once "
+                         "to merge several lists (later ones take precedence).")
 parser.add_argument('--custom', action='append', default=[],
                     help="Custom abbreviations separated by equal signs, e.g., -c 'Journal of Kittens;J. Kitt.'"
                          "You can call this argument more than once. These will be cached.")
@@ -43,6 +49,23 @@ parser.add_argument('--citing', action='store_true', default=False,
                     help="Return dois that cite the papers in the input doi(s).")
 parser.add_argument('--llm-model', type=str, default=None,
                     help="Specify the LLM model to use from config. Updates the default.")
+parser.add_argument('--max-connections', type=int, default=10,
+                    help="Maximum concurrent connections per host.")
+parser.add_argument('--keepalive', type=float, default=30.0,
+                    help="Seconds to keep idle connections open for reuse.")
+parser.add_argument('--no-http2', action='store_true', default=False,
+                    help="Disable HTTP/2 even if h2 is installed.")
+parser.add_argument('--workers', type=int, default=8,
+                    help="Number of DOIs to resolve concurrently.")
+parser.add_argument('--lazy', action='store_true', default=False,
+                    help="Index the --bibtexdb file and only parse the entries that are needed "
+                         "(fast for very large libraries; unchanged entries are written back as-is).")
+parser.add_argument('--backend', choices=('doi', 'crossref'), default='doi',
+                    help="Resolve DOIs by content negotiation on doi.org, or in bulk from the "
+                         "Crossref REST API (falling back to doi.org for other registrars).")
+parser.add_argument('--resume', action='store_true', default=False,
+                    help="Resume an interrupted run from the journal next to the output file, "
+                         "skipping DOIs that already resolved.")
 
 #  Initialize Subparsers
 subparsers = parser.add_subparsers(help='sub-command help', required=True, dest='outputmode',
@@ -61,6 +84,11 @@ subparser_bibtexdb.add_argument('--dedupe', action='store_true', default=False,
                                 help='Dedupe the bibtex library.')
 subparser_bibtexdb.add_argument('--llm', action='store_true', default=False,
                                 help='Use LLM for deduplication (experimental).')
+subparser_bibtexdb.add_argument('--append', action='store_true', default=False,
+                                help='Only append new entries to the end of the output file, '
+                                     'without parsing or rewriting what is already there (implies --lazy).')
+subparser_bibtexdb.add_argument('--stream', action='store_true', default=False,
+                                help='Append entries to the output file as they resolve instead of at the end.')
 
 # # #  HTML subparser options # # #
 subparser_html = subparsers.add_parser('html', help='Write output to HTML bibliography.')
@@ -159,6 +187,9 @@ subparser_tex.add_argument('--llm', action='store_true', default=False,
 argcomplete.autocomplete(parser)
 opts = parser.parse_args()
 
+if not opts.database:
+    opts.database = [DATABASE]
+
 if opts.outputmode == 'webserver' and opts.loglevel == 'warning':
     opts.loglevel = 'info'
 
@@ -169,6 +200,14 @@ if opts.outputmode == 'bibtexdb':
         opts.out = 'doi2bibtex.bib'
     elif opts.bibtexdb and not opts.out:
         opts.out = opts.bibtexdb
+    if opts.append:
+        if opts.clean or opts.dedupe:
+            parser.error('--append cannot be combined with --clean or --dedupe')
+        if opts.bibtexdb and os.path.abspath(opts.bibtexdb) != os.path.abspath(opts.out):
+            parser.error('--append writes to the --bibtexdb file, -o must be the same file')
+        # The file we append to is the library we check for existing DOIs
+        opts.bibtexdb = opts.out
+        opts.lazy = True
 if opts.outputmode == 'textfile':
     if opts.replace and not opts.doifile:
         parser.error('--replace requires --doifile')
@@ -1,4 +1,5 @@
 from .bibtexdb import do_bibtexdb as bibtexdb
+from .bibtexdb import open_stream, append_bib
 from .clipboard import do_clipboard as clipboard
 from .textfile import do_textfile as textfile
 from .list import do_html as html
@@ -15,19 +15,41 @@ layers = [
 ]
 
 async def do_bibtexdb(library: bibtexparser.library, args):
+    if getattr(args, 'stream', False):
+        # New entries are already on disk; only rewrite if asked to clean or dedupe
+        if not (args.clean or args.dedupe):
+            console.print(f'[bold yellow]Entries were appended to [cyan]{args.out}[/cyan].[/bold yellow]')
+            return
+        library = bibtex.read(args.out)
+    if getattr(args, 'append', False):
+        if library.new:
+            append_bib(library.new, args.out)
+            console.print(f'[bold yellow]Appended {len(library.new)} entries to [cyan]{args.out}[/cyan].[/bold yellow]')
+        else:
+            console.print('[bold yellow]Nothing new to append.[/bold yellow]')
+        return
+    if isinstance(library, bibtex.LazyLibrary) and (args.clean or args.dedupe):
+        library = library.materialize()
     journals = util.loadabbreviations(args.database,
                                       custom=args.custom,
-                                      refresh=args.refresh)
+                                      refresh=args.refresh,
+                                      offline=args.offline)
     if args.clean and journals:
-        cleaner = bibtex.EntryCleaner(library, journals)
+        cleaner = bibtex.EntryCleaner(library, journals,
+                                      util.loaddecisions(forget=args.forget))
         library = await cleaner.clean()
         journals.update(cleaner.custom)
         util.updatecache(journals)
+        util.writedecisions(cleaner.history, cleaner.iso4)
     elif args.clean:
         console.print("[bold red]No journals parsed, cannot clean.[/bold red]")
     if args.dedupe:
         library, _ = bibtex.dedupe(library, use_llm=args.llm, llm_model=args.llm_model)
-    if not library.entries:
+    if isinstance(library, bibtex.LazyLibrary):
+        _empty = not len(library)  # Without parsing every block
+    else:
+        _empty = not library.entries
+    if _empty:
         console.print('[bold yellow]Not writing empty library to file.[/bold yellow]')
     elif interact.ask(f"Save library to {args.out}?"):
         write_bib(library, args.out)
@@ -37,12 +59,61 @@ async def do_bibtexdb(library: bibtexparser.library, args):
 
 
 def write_bib(library: bibtexparser.library, db: str):
+    _backup(db)
+    if isinstance(library, bibtex.LazyLibrary):
+        # Untouched blocks are copied as they are, only new entries get rendered
+        library.write(db, _render)
+    else:
+        bibtexparser.write_file(db, library, bibtex_format=_bibtex_format())
+    console.print(f'[bold yellow]Wrote [cyan]{db}[/cyan].[/bold yellow]')
+
+
+def append_bib(entries, db: str):
+    '''Append entries to the end of db without rewriting what is already there.'''
+    _bib = _render(entries)
+    separator = ''
+    if os.path.exists(db) and os.path.getsize(db):
+        with open(db, 'rb') as fh:
+            fh.seek(max(0, os.path.getsize(db) - 2))
+            tail = fh.read()
+        # Leave exactly one blank line between the last block and the new ones
+        separator = '\n' * (2 - (len(tail) - len(tail.rstrip(b'\n'))))
+    with open(db, 'a', encoding='utf-8') as fh:
+        fh.write(separator + _bib.strip('\n') + '\n')
+
+
+def open_stream(library: bibtexparser.library, args):
+    '''Prepare args.out to receive streamed entries and return a function that appends one.
+
+    args.out ends up holding the existing library followed by every
+    entry passed to the returned function, written as soon as it arrives.'''
+    if getattr(args, 'append', False):
+        pass  # Appending is all we do to args.out, nothing to back up
+    elif args.bibtexdb and os.path.exists(args.out) and os.path.samefile(args.bibtexdb, args.out):
+        _backup(args.out)
+    else:
+        write_bib(library, args.out)
+    console.print(f'[bold yellow]Streaming new entries to [cyan]{args.out}[/cyan].[/bold yellow]')
+
+    def append(entry):
+        append_bib([entry], args.out)
+    return append
+
+
+def _backup(db: str):
     if os.path.exists(db):
         _backup = f'{db}.bak'
         console.print(f'[bold yellow]Backing up [cyan]{db}[/cyan] as [cyan]{_backup}[/cyan][/bold yellow]')
         shutil.copy(db, _backup)
+
+
+def _render(entries) -> str:
+    return bibtexparser.write_string(bibtexparser.Library(list(entries)),
+                                     bibtex_format=_bibtex_format())
+
+
+def _bibtex_format():
     bibtex_format = bibtexparser.BibtexFormat()
     bibtex_format.indent = '    '
     bibtex_format.block_separator = '\n\n'
-    bibtexparser.write_file(db, library, bibtex_format=bibtex_format)
-    console.print(f'[bold yellow]Wrote [cyan]{db}[/cyan].[/bold yellow]')
\ No newline at end of file
+    return bibtex_format
\ No newline at end of file
@@ -7,7 +7,7 @@ import asyncio
 import random
 import logging
 from tqdm.asyncio import tqdm
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 
 PDFURL = re.compile(r'//(.*\.pdf\?download=true)')
 
@@ -49,36 +49,38 @@ async def do_pdfs(library, args):
     baseurl = args.mirror.strip('/')
     urls = {}
     errs = []
-    with _buffer_logs():
-        for entry in tqdm(library.entries, desc="Resolving pdf links", total=total_entries, unit="doi"):
-        # for entry in library.entries:
-            doi = _finddoi(entry)
-            if not doi:
-                errs.append(entry)
-                continue
-            url = await async_get_pdf_links_from_urls(f"{baseurl}/{doi}", args.proxy)
-            if url:
-                urls[doi] = f"https://{url}"
-            else:
-                errs.append(doi)
-            await asyncio.sleep(10 + (random.random() * 0.5))
-    logger.debug(f"Processing {urls}")
-    if errs:
-        logger.warning(f"Could not get pdf links from {errs}.")
+    # One pooled client (through the proxy) for link lookups and downloads
+    async with util.new_client(proxy=proxy, timeout=10) as client:
+        with _buffer_logs():
+            for entry in tqdm(library.entries, desc="Resolving pdf links", total=total_entries, unit="doi"):
+            # for entry in library.entries:
+                doi = _finddoi(entry)
+                if not doi:
+                    errs.append(entry)
+                    continue
+                url = await async_get_pdf_links_from_urls(f"{baseurl}/{doi}", args.proxy, client=client)
+                if url:
+                    urls[doi] = f"https://{url}"
+                else:
+                    errs.append(doi)
+                await asyncio.sleep(10 + (random.random() * 0.5))
+        logger.debug(f"Processing {urls}")
+        if errs:
+            logger.warning(f"Could not get pdf links from {errs}.")
 
     
-    pdfurls = {}
-    for doi, url in urls.items():
-        if args.filename:
-            pdfpath = Path(Path(args.filename).with_suffix('.pdf'))
-        else:
-            pdfpath = Path(doi.replace('/', '_')+'.pdf')
-        i = 0
-        while any([pdfpath.exists(), pdfpath in pdfurls.values()]):
-            pdfpath = Path(f"{pdfpath.name}_{i:02d}"+'.pdf')
-        pdfurls[url] = pdfpath
+        pdfurls = {}
+        for doi, url in urls.items():
+            if args.filename:
+                pdfpath = Path(Path(args.filename).with_suffix('.pdf'))
+            else:
+                pdfpath = Path(doi.replace('/', '_')+'.pdf')
+            i = 0
+            while any([pdfpath.exists(), pdfpath in pdfurls.values()]):
+                pdfpath = Path(f"{pdfpath.name}_{i:02d}"+'.pdf')
+            pdfurls[url] = pdfpath
    
-    downloaded_pdfs = await util.downloadPDFs(list(pdfurls.keys()), proxy)
+        downloaded_pdfs = await util.downloadPDFs(list(pdfurls.keys()), proxy, client=client)
     failed = []
     successful_downloads = 0
     for url, pdf_data in downloaded_pdfs.items():
@@ -103,7 +105,8 @@ async def do_pdfs(library, args):
         logger.warning(f"Successful downloads: {successful_downloads} / {total_entries - len(errs)} Failed to resolve {len(errs)} dois.")
         logger.warning(f"Failed urls: {failed}")
 
-async def async_get_pdf_links_from_urls(url: Union[str, bytes, None], proxy) -> str:
+async def async_get_pdf_links_from_urls(url: Union[str, bytes, None], proxy,
+                                        client: Optional[httpx.AsyncClient] = None) -> str:
     if url is None:
         return ''
     if isinstance(url, bytes):
@@ -119,9 +122,13 @@ async def async_get_pdf_links_from_urls(url: Union[str, bytes, None], proxy) ->
         "Connection": "keep-alive",
     }
     html = None
-    async with httpx.AsyncClient(proxy=proxy, headers=headers, follow_redirects=True, timeout=10) as client:
+    if client is None:
+        _client = httpx.AsyncClient(proxy=proxy, headers=headers, follow_redirects=True, timeout=10)
+    else:
+        _client = nullcontext(client)
+    async with _client as client:
         try:
-            response = await client.get(url)
+            response = await client.get(url, headers=headers)
             response.raise_for_status()
             html = response.text
         except httpx.HTTPStatusError as err:
@@ -1,13 +1,21 @@
 import urllib.parse
 from .getdoilogger import return_logger as getlogger
 from .doifinder import find_doi, find_doi_in_bytearray, parse_doi_from_url
-from .cache import loadcache, writetodisk
+from .cache import loadcache, writetodisk, loaddecisions, writedecisions
+from .journaldb import JournalDB
 from .abbreviso import local_iso4
 from .LaTexAccents import AccentConverter
 from .encode import LatexEncoder
 from .spinner import Spinner
 from .pdfdownloader import download_pdfs
 from .web import get_user_agent
+from .httpclient import get_client, new_client, close_client, shared_client
+from .httpclient import configure as configure_http
+from .doicache import get_doicache
+from .doicache import configure as configure_doicache
+from .jobjournal import JobJournal
+from . import jobjournal
+from .singleflight import SingleFlight, singleflight
 from .validate import validate_and_fix_bibtex
 
 # def doitobibtex(doi):
@@ -17,6 +25,8 @@ from .validate import validate_and_fix_bibtex
 #     return return_logger(_name, **kwargs)
 
 def doi_from_url(url_string):
+    if isinstance(url_string, bytes):
+        url_string = str(url_string, encoding='utf-8')
     return parse_doi_from_url(url_string)
 
 def doifinder(textstring):
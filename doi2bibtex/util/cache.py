@@ -2,10 +2,13 @@
 import os
 import re
 import tempfile
+import time
 import pickle
+import sqlite3
 import urllib.request
 from urllib.error import HTTPError
 from .getdoilogger import return_logger
+from .journaldb import JournalDB
 
 logger = return_logger(__name__)
 
@@ -27,53 +30,132 @@ if not os.path.exists(CACHEDIR):
         # Fall back to global tempdir
         CACHEDIR = tempfile.gettempdir()
 
-JCACHE = os.path.join(CACHEDIR,'journal_abbreviations.cache')
+JCACHE = os.path.join(CACHEDIR,'journal_abbreviations.cache')  # Pickled by earlier versions
+JDB = os.path.join(CACHEDIR,'journal_abbreviations.sqlite')
+MAX_AGE = 7 * 24 * 3600  # Seconds before a downloaded list is revalidated
+DCACHE = os.path.join(CACHEDIR,'journal_decisions.cache')
+DECISIONS_VERSION = 1  # Bump when the layout of the decision store changes
 
 
-def refresh():
-    '''Delete the disk cache'''
-    logger.debug(f"Expiring {JCACHE}")
-    if os.path.exists(JCACHE):
-        os.remove(JCACHE)
+def _import_pickle(db, databases):
+    '''Move the journals of a pickled cache from an earlier version into db.'''
+    try:
+        with open(JCACHE, 'rb') as fh:
+            _store = pickle.load(fh)
+    except Exception:
+        logger.error('Error loading cache from %s.', JCACHE)
+        return
+    if not isinstance(_store, dict):
+        return
+    logger.debug('Importing journal abbreviations from %s.', JCACHE)
+    if 'version' not in _store:
+        # A bare {name: abbreviation}: use it as the first list until it is revalidated
+        _store = {'sources': {databases[0]: {'journals': _store, 'checked': 0}}, 'custom': {}}
+    for url, source in _store.get('sources', {}).items():
+        db.set_source(url, source['journals'], source.get('etag'), source.get('last_modified'),
+                      source.get('checked', 0))
+    for _k, _v in _store.get('custom', {}).items():
+        db.set_custom(_k, _v)
+
+def _fetch(url, source):
+    '''GET url unless it matches the ETag/Last-Modified of source (raises HTTPError 304 if so).'''
+    req = urllib.request.Request(url)
+    if source.get('etag'):
+        req.add_header('If-None-Match', source['etag'])
+    if source.get('last_modified'):
+        req.add_header('If-Modified-Since', source['last_modified'])
+    with urllib.request.urlopen(req, timeout=30) as f:
+        _r = f.read().decode()
+        return parseabbreviations(_r.split('\n')), f.headers.get('ETag'), f.headers.get('Last-Modified')
 
 def loadcache(database, **kwargs):
-    '''Fetch journals from disk cache.'''
-    if kwargs.get('refresh', False):
-        refresh()
-    journals = {}
-    if not os.path.exists(JCACHE):
-        logger.debug('Fetching list of common journal abbreviations.')
-        req = urllib.request.Request(database)
+    '''Fetch journals from disk cache.
+
+    database is the URL of a JabRef abbreviation list, or a list of them
+    (later lists win). Lists are revalidated with a conditional GET once
+    they are MAX_AGE old, or on refresh, but never when offline. Returns a
+    JournalDB, which is only rebuilt when something changed.'''
+    databases = [database] if isinstance(database, str) else list(database)
+    try:
+        db = JournalDB(JDB)
+    except sqlite3.Error as err:
+        logger.error(f'Cannot open journal store {JDB}: {err}')
+        return {}
+    if db.databases is None and os.path.exists(JCACHE):
+        _import_pickle(db, databases)
+    changed = False
+    for url in databases:
+        source = db.source(url)
+        if source and not kwargs.get('refresh', False) and time.time() - source['checked'] < MAX_AGE:
+            continue
+        if kwargs.get('offline', False):
+            logger.warning(f'Not fetching journal abbreviations from {url} (offline mode).')
+            continue
+        logger.debug(f'Fetching list of common journal abbreviations from {url}.')
         try:
-            with urllib.request.urlopen(req) as f:
-                _r = f.read().decode()
-            journals = parseabbreviations(_r.split('\n'))
+            db.set_source(url, *_fetch(url, source or {}))
+            changed = True
         except HTTPError as err:
-            logger.error("Error fetching journal abbreviations with code %s", err.code)
-            journals = {}
-    else:
-        try:
-            journals = pickle.load(open(JCACHE,'rb'))
-            logger.debug('Read journal abbreciations from %s.', JCACHE)
-        except OSError:
-            logger.error('Error loading cache from %s.', JCACHE)
-            kwargs['refresh'] = True
-            loadcache(database, **kwargs)
+            if err.code == 304 and source:
+                logger.debug(f'Journal abbreviations from {url} are unchanged.')
+                db.touch(url)
+            else:
+                logger.error("Error fetching journal abbreviations with code %s", err.code)
+        except OSError as err:
+            logger.error("Error fetching journal abbreviations from %s: %s", url, err)
     if kwargs.get('custom', []):
         for _custom in kwargs['custom']:
             _k, _v = _custom.split(';')
-            journals[_k.strp()] = _v.strip()
-    writetodisk(journals)
-    logger.debug(f"Loaded {len(journals)} abbreviations.")
-    return journals
+            changed = db.set_custom(_k.strip(), _v.strip()) or changed
+    if changed or db.databases != databases:
+        db.rebuild(databases)
+    logger.debug(f"Loaded {len(db)} abbreviations.")
+    return db
 
 def writetodisk(journals):
-    '''Save cache to disk'''
+    '''Save cache to disk, keeping abbreviations that differ from the downloaded lists as custom ones'''
+    if isinstance(journals, JournalDB):
+        return  # Changes are written as they are made
+    try:
+        db = JournalDB(JDB)
+        db.update(journals)
+        db.close()
+    except sqlite3.Error as err:
+        logger.debug(f'Error saving journal abbreviations to {JDB}: {err}')
+
+def loaddecisions(**kwargs):
+    '''Fetch remembered journal decisions and ISO4 abbreviations from disk.
+
+    decisions maps a journal name to the abbreviation the user settled on,
+    or to None if it should never be abbreviated.'''
+    store = {'version': DECISIONS_VERSION, 'decisions': {}, 'iso4': {}}
+    if kwargs.get('forget', False) and os.path.exists(DCACHE):
+        logger.debug(f"Expiring {DCACHE}")
+        os.remove(DCACHE)
+    if not os.path.exists(DCACHE):
+        return store
+    try:
+        with open(DCACHE, 'rb') as fh:
+            _store = pickle.load(fh)
+    except Exception as e:
+        logger.warning(f"Could not read journal decisions from {DCACHE}: {e}")
+        return store
+    if not isinstance(_store, dict) or _store.get('version') != DECISIONS_VERSION:
+        logger.debug('Ignoring journal decisions from an older version in %s.', DCACHE)
+        return store
+    logger.debug(f"Loaded {len(_store['decisions'])} journal decisions.")
+    return _store
+
+def writedecisions(decisions, iso4):
+    '''Save journal decisions and ISO4 abbreviations to disk'''
+    store = {'version': DECISIONS_VERSION, 'decisions': dict(decisions), 'iso4': dict(iso4)}
     try:
-        pickle.dump(journals,open(JCACHE,'wb'))
-        logger.debug('Saved cache to %s', JCACHE)
+        with open(DCACHE + '.tmp', 'wb') as fh:
+            pickle.dump(store, fh)
+        os.replace(DCACHE + '.tmp', DCACHE)
+        logger.debug('Saved journal decisions to %s', DCACHE)
     except OSError:
-        logger.debug('Error saving cache to %s', JCACHE)
+        logger.debug('Error saving journal decisions to %s', DCACHE)
 
 def parseabbreviations(entries):
     '''Parse abbreviations in the format "ACS Applied Materials & Interfaces","ACS Appl. Mater. Interfaces"'''
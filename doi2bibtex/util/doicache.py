@@ -0,0 +1,135 @@
+'''Persistent on-disk cache of resolved BibTeX and OpenAlex metadata keyed by DOI'''
+import os
+import json
+import time
+import sqlite3
+from typing import Optional
+from .cache import CACHEDIR
+from .getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+DOICACHE = os.path.join(CACHEDIR, 'doi2bibtex_dois.sqlite')
+
+DAY = 86400
+TTL = {'record': 180 * DAY,    # Published records rarely change
+       'metadata': 30 * DAY,   # OpenAlex enriches works over time
+       'miss': DAY}            # DOIs OpenAlex did not know yet; it indexes new works within days
+TOUCH = 3600                   # Only record an access when the last one is older than this
+MAX_BYTES = 256 * 1024 * 1024  # Evict least recently used rows past this
+EVICT_TO = 0.8                 # ...down to this fraction of MAX_BYTES
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS dois (
+                kind TEXT NOT NULL,
+                doi TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (kind, doi))'''
+
+
+class DOICache:
+    '''SQLite store of resolver results.
+
+    offline: only ever read from the cache, never go to the network.
+    refresh: ignore cached values (but store fresh results).'''
+
+    def __init__(self, path: str = DOICACHE, **kwargs):
+        self.path = path
+        self.offline = kwargs.get('offline', False)
+        self.refresh = kwargs.get('refresh', False)
+        self.ttl = dict(TTL, **kwargs.get('ttl', {}))
+        self.max_bytes = kwargs.get('max_bytes', MAX_BYTES)
+        self._db: Optional[sqlite3.Connection] = None
+        self._bytes = 0  # Running total of the size column, so put never sums the table
+
+    @property
+    def db(self) -> Optional[sqlite3.Connection]:
+        if self._db is None:
+            try:
+                self._db = sqlite3.connect(self.path, check_same_thread=False)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(SCHEMA)
+                self._db.execute('CREATE INDEX IF NOT EXISTS dois_accessed ON dois (accessed)')
+                self._db.commit()
+                self._bytes = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM dois').fetchone()[0]
+            except sqlite3.Error as err:
+                logger.error(f'Cannot open DOI cache {self.path}: {err}')
+                self._db = None
+        return self._db
+
+    def get(self, kind: str, doi: str):
+        '''Return the cached value for doi, or None if missing, expired or refreshing.'''
+        if self.refresh or self.db is None:
+            return None
+        doi = doi.lower()
+        row = self.db.execute('SELECT value, fetched, accessed FROM dois WHERE kind=? AND doi=?',
+                              (kind, doi)).fetchone()
+        if row is None:
+            return None
+        value, fetched, accessed = row
+        now = time.time()
+        if not self.offline and now - fetched > self.ttl.get(kind, 0):
+            logger.debug(f'Cached {kind} for {doi} expired.')
+            return None
+        # Eviction only needs a rough recency, so a hit is not a write every time
+        if now - accessed > TOUCH:
+            self.db.execute('UPDATE dois SET accessed=? WHERE kind=? AND doi=?', (now, kind, doi))
+            self.db.commit()
+        return json.loads(value)
+
+    def put(self, kind: str, doi: str, value):
+        '''Store value (anything json-serializable) for doi.'''
+        if self.db is None or not value:
+            return
+        _value = json.dumps(value)
+        now = time.time()
+        old = self.db.execute('SELECT size FROM dois WHERE kind=? AND doi=?', (kind, doi.lower())).fetchone()
+        self._bytes += len(_value) - (old[0] if old else 0)
+        self.db.execute('INSERT OR REPLACE INTO dois VALUES (?, ?, ?, ?, ?, ?)',
+                        (kind, doi.lower(), _value, len(_value), now, now))
+        self.db.commit()
+        self._evict()
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        target = self._bytes - int(self.max_bytes * EVICT_TO)
+        logger.debug(f'DOI cache is {self._bytes} bytes, evicting {target} bytes.')
+        freed = 0
+        doomed = []
+        for kind, doi, size in self.db.execute('SELECT kind, doi, size FROM dois ORDER BY accessed'):
+            doomed.append((kind, doi))
+            freed += size
+            if freed >= target:
+                break
+        self.db.executemany('DELETE FROM dois WHERE kind=? AND doi=?', doomed)
+        self.db.commit()
+        self._bytes -= freed
+
+    def clear(self):
+        '''Delete every cached record.'''
+        if self.db is not None:
+            self.db.execute('DELETE FROM dois')
+            self.db.commit()
+            self._bytes = 0
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_cache = DOICache()
+
+
+def configure(**kwargs):
+    '''Replace the shared cache, e.g., configure(offline=True) or configure(refresh=True).'''
+    global _cache
+    _cache.close()
+    _cache = DOICache(**kwargs)
+
+
+def get_doicache() -> DOICache:
+    return _cache
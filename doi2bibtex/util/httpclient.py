@@ -0,0 +1,149 @@
+'''Shared, pooled httpx client for DOI resolvers, OpenAlex and friends'''
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+import httpx
+from .getdoilogger import return_logger
+from .ratelimit import get_limiter
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+logger = return_logger(__name__)
+
+MAX_CONNECTIONS = 10      # Per host
+MAX_KEEPALIVE = 20        # Idle connections kept open in the pool
+KEEPALIVE_EXPIRY = 30.0   # Seconds before an idle connection is dropped
+TIMEOUT = 30.0
+RETRIES = 2               # Extra attempts after a 429 once the limiter allows it
+
+_client: Optional[httpx.AsyncClient] = None
+_settings = {'max_connections': MAX_CONNECTIONS,
+             'max_keepalive': MAX_KEEPALIVE,
+             'keepalive_expiry': KEEPALIVE_EXPIRY,
+             'http2': HTTP2}
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    '''Response stream that frees a per-host slot once the body is consumed.'''
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    '''Wrap a transport so that no host gets more than max_per_host requests in flight.
+
+    httpx only caps the size of the whole pool, so without this one slow
+    upstream (e.g., dx.doi.org redirects) can starve every other host.
+    Requests also pass through the shared per-host rate limiter, which is
+    fed every response so it can back off on 429s and speed up otherwise.'''
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slots.setdefault(request.url.host, asyncio.Semaphore(self._max_per_host))
+        await slot.acquire()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                slot.release()
+
+        limiter = get_limiter(request.url.host)
+        try:
+            for attempt in range(RETRIES + 1):
+                if limiter is not None:
+                    await limiter.acquire()
+                response = await self._transport.handle_async_request(request)
+                if limiter is None:
+                    break
+                limiter.feedback(response.status_code, response.headers)
+                if response.status_code != 429 or attempt == RETRIES:
+                    break
+                logger.debug(f"429 from {request.url.host}, retry {attempt + 1}/{RETRIES}")
+                await response.aclose()
+        except BaseException:
+            release()
+            raise
+        return httpx.Response(status_code=response.status_code,
+                              headers=response.headers,
+                              stream=_ReleasingStream(response.stream, release),
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def configure(**kwargs):
+    '''Set pool options used the next time the shared client is created.'''
+    for _key, _val in kwargs.items():
+        if _key not in _settings:
+            raise TypeError(f"Unknown http client setting '{_key}'")
+        if _val is not None:
+            _settings[_key] = _val
+    if _settings['http2'] and not HTTP2:
+        logger.warning("HTTP/2 requested but h2 is not installed (pip install httpx[http2]).")
+        _settings['http2'] = False
+
+
+def new_client(**kwargs) -> httpx.AsyncClient:
+    '''Return a fresh pooled AsyncClient; extra kwargs are passed to httpx.'''
+    max_connections = kwargs.pop('max_connections', _settings['max_connections'])
+    max_keepalive = kwargs.pop('max_keepalive', _settings['max_keepalive'])
+    keepalive_expiry = kwargs.pop('keepalive_expiry', _settings['keepalive_expiry'])
+    http2 = kwargs.pop('http2', _settings['http2']) and HTTP2
+    transport = httpx.AsyncHTTPTransport(http2=http2,
+                                         limits=httpx.Limits(max_connections=None,
+                                                             max_keepalive_connections=max_keepalive,
+                                                             keepalive_expiry=keepalive_expiry),
+                                         proxy=kwargs.pop('proxy', None),
+                                         retries=1)
+    kwargs.setdefault('timeout', TIMEOUT)
+    kwargs.setdefault('follow_redirects', True)
+    logger.debug(f"New http client (http2={http2}, per-host={max_connections}, keepalive={max_keepalive})")
+    return httpx.AsyncClient(transport=HostLimitedTransport(transport, max_connections), **kwargs)
+
+
+def get_client() -> httpx.AsyncClient:
+    '''Return the process-wide shared client, creating it on first use.'''
+    global _client
+    if _client is None or _client.is_closed:
+        _client = new_client()
+    return _client
+
+
+async def close_client():
+    '''Close the shared client (safe to call more than once).'''
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+@asynccontextmanager
+async def shared_client():
+    '''Open the shared client for the duration of a block and close it afterwards.'''
+    try:
+        yield get_client()
+    finally:
+        await close_client()
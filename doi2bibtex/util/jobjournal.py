@@ -0,0 +1,104 @@
+'''Append-only checkpoint journal so long DOI runs can be resumed'''
+import os
+import json
+from typing import Dict, Iterator, Tuple
+from .getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+PENDING = 'pending'
+RESOLVED = 'resolved'
+FAILED = 'failed'
+
+
+class JobJournal:
+    '''Record the state of every DOI in a run as JSON lines next to the output file.
+
+    Each line is {"doi", "state", ...}; the last line for a DOI wins. Resolved
+    records keep the BibTeX so a resumed run can restore entries that never
+    made it into the output file; only the states are kept in memory and the
+    BibTeX is read back from the file when it is needed.'''
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.states: Dict[str, str] = {}  # Lowercased DOI -> state of its last line
+        if resume:
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+        self._fh = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def for_output(cls, out: str, **kwargs):
+        return cls(f'{out}.journal', **kwargs)
+
+    def _records(self) -> Iterator[dict]:
+        with open(self.path, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:  # A crash can leave a truncated last line
+                    continue
+                if isinstance(record, dict) and isinstance(record.get('doi'), str) and 'state' in record:
+                    yield record
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.warning(f'No journal found at {self.path}, starting from scratch.')
+            return
+        for record in self._records():
+            self.states[record['doi'].lower()] = record['state']
+        logger.debug(f'Loaded {len(self.states)} journal records from {self.path}.')
+
+    def _write(self, doi: str, state: str, **kwargs):
+        self.states[doi.lower()] = state
+        self._fh.write(json.dumps(dict(doi=doi, state=state, **kwargs)) + '\n')
+        self._fh.flush()
+
+    def state(self, doi: str):
+        return self.states.get(doi.lower())
+
+    def resolved(self) -> Iterator[Tuple[str, str]]:
+        '''Yield (doi, bibtex) for every DOI already resolved, reading the BibTeX from the journal file.'''
+        if not self._fh.closed:
+            self._fh.flush()
+        # The last line of a DOI wins, so find it first and only then read its BibTeX
+        last = {_r['doi'].lower(): _n for _n, _r in enumerate(self._records())}
+        for _n, record in enumerate(self._records()):
+            if record['state'] == RESOLVED and last.get(record['doi'].lower()) == _n:
+                yield record['doi'], record.get('bibtex', '')
+
+    def pending(self, dois):
+        '''Mark dois as pending in one write.'''
+        lines = []
+        for doi in dois:
+            self.states[doi.lower()] = PENDING
+            lines.append(json.dumps({'doi': doi, 'state': PENDING}) + '\n')
+        self._fh.writelines(lines)
+        self._fh.flush()
+
+    def resolve(self, doi: str, bibtex: str):
+        self._write(doi, RESOLVED, bibtex=bibtex)
+
+    def fail(self, doi: str, reason: str):
+        self._write(doi, FAILED, reason=reason)
+
+    def summary(self):
+        counts = {PENDING: 0, RESOLVED: 0, FAILED: 0}
+        for state in self.states.values():
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def close(self):
+        if not self._fh.closed:
+            self._fh.close()
+
+    def complete(self) -> bool:
+        '''True if every DOI in the run resolved.'''
+        return all(_s == RESOLVED for _s in self.states.values())
+
+    def discard(self):
+        '''Close and delete the journal (it holds the BibTeX of every resolved DOI).'''
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,260 @@
+'''On-disk store of journal abbreviations with an SQLite trigram index, queried without loading it'''
+import json
+import re
+import time
+import sqlite3
+from array import array
+from collections import Counter
+from typing import Dict, Optional, Tuple
+import Levenshtein
+from .getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+VERSION = '2'        # Bump when the schema or the trigram scheme changes
+CANDIDATES = 100     # Names scored with Levenshtein per lookup
+COMMON = 0.5         # Posting lists longer than this fraction of all names are not counted
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+SCHEMA = ('''CREATE TABLE IF NOT EXISTS meta (
+                 key TEXT PRIMARY KEY,
+                 value TEXT NOT NULL)''',
+          # Downloaded lists, kept so they can be merged again when one of them changes
+          '''CREATE TABLE IF NOT EXISTS sources (
+                 url TEXT PRIMARY KEY,
+                 etag TEXT,
+                 last_modified TEXT,
+                 checked REAL NOT NULL)''',
+          '''CREATE TABLE IF NOT EXISTS listed (
+                 url TEXT NOT NULL,
+                 name TEXT NOT NULL,
+                 abbrev TEXT NOT NULL)''',
+          '''CREATE TABLE IF NOT EXISTS custom (
+                 name TEXT PRIMARY KEY,
+                 abbrev TEXT NOT NULL)''',
+          # The merged lookup structure: every full name (full=1) and abbreviation (full=0)
+          '''CREATE TABLE IF NOT EXISTS names (
+                 id INTEGER PRIMARY KEY,
+                 name TEXT NOT NULL,
+                 norm TEXT NOT NULL,
+                 abbrev TEXT NOT NULL,
+                 full INTEGER NOT NULL)''',
+          # Posting list of each trigram: the ids of the names containing it, packed
+          '''CREATE TABLE IF NOT EXISTS grams (
+                 gram TEXT PRIMARY KEY,
+                 n INTEGER NOT NULL,
+                 ids BLOB NOT NULL) WITHOUT ROWID''',
+          'CREATE INDEX IF NOT EXISTS listed_url ON listed (url)',
+          'CREATE INDEX IF NOT EXISTS names_name ON names (name)',
+          'CREATE INDEX IF NOT EXISTS names_norm ON names (norm)',
+          'CREATE INDEX IF NOT EXISTS names_abbrev ON names (abbrev)')
+
+
+def normalize(name: str) -> str:
+    return ' '.join(PUNCTUATION.sub(' ', name.casefold()).split())
+
+
+def trigrams(name: str) -> set:
+    _name = f'  {normalize(name)} '
+    return {_name[i:i + 3] for i in range(len(_name) - 2)}
+
+
+def _marks(values) -> str:
+    return ','.join('?' * len(values))
+
+
+class JournalDB:
+    '''A {full name: abbreviation} mapping in SQLite with fuzzy journal lookups.
+
+    Opening it reads nothing but a few metadata rows; exact lookups are
+    index seeks and fuzzy matching only scores the CANDIDATES names that
+    share the most trigrams with the query.'''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        if self._meta('version') not in (None, VERSION):
+            logger.debug(f'Discarding journal store {path} from another version.')
+            for (table,) in self.db.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall():
+                self.db.execute(f'DROP TABLE {table}')
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self._setmeta(version=VERSION)
+        self.db.commit()
+
+    @classmethod
+    def from_journals(cls, journals: Dict[str, str], path: str = ':memory:'):
+        '''Index a plain {full name: abbreviation} dict (in memory unless path is given).'''
+        db = cls(path)
+        db.set_source('', journals)
+        db.rebuild([''])
+        return db
+
+    def _meta(self, key: str):
+        try:
+            row = self.db.execute('SELECT value FROM meta WHERE key=?', (key,)).fetchone()
+        except sqlite3.OperationalError:  # No meta table yet
+            return None
+        return row[0] if row else None
+
+    def _setmeta(self, **values):
+        self.db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                            [(_k, str(_v)) for _k, _v in values.items()])
+
+    # Downloaded lists and custom abbreviations
+
+    def source(self, url: str) -> Optional[dict]:
+        '''Validators and last check time of a downloaded list, or None.'''
+        row = self.db.execute('SELECT etag, last_modified, checked FROM sources WHERE url=?', (url,)).fetchone()
+        return dict(zip(('etag', 'last_modified', 'checked'), row)) if row else None
+
+    def set_source(self, url: str, journals: Dict[str, str], etag=None, last_modified=None, checked=None):
+        '''Store a freshly downloaded list (call rebuild to merge it).'''
+        self.db.execute('DELETE FROM listed WHERE url=?', (url,))
+        self.db.executemany('INSERT INTO listed VALUES (?, ?, ?)',
+                            ((url, _k, _v) for _k, _v in journals.items()))
+        self.db.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)',
+                        (url, etag, last_modified, time.time() if checked is None else checked))
+        self.db.commit()
+
+    def touch(self, url: str):
+        '''Record that a list was revalidated and found unchanged.'''
+        self.db.execute('UPDATE sources SET checked=? WHERE url=?', (time.time(), url))
+        self.db.commit()
+
+    def set_custom(self, name: str, abbrev: str) -> bool:
+        '''Store a custom abbreviation (call rebuild to merge it); return whether it changed.'''
+        row = self.db.execute('SELECT abbrev FROM custom WHERE name=?', (name,)).fetchone()
+        if row and row[0] == abbrev:
+            return False
+        self.db.execute('INSERT OR REPLACE INTO custom VALUES (?, ?)', (name, abbrev))
+        self.db.commit()
+        return True
+
+    @property
+    def databases(self) -> list:
+        '''URLs of the lists the lookup structure was merged from.'''
+        return json.loads(self._meta('databases') or 'null')
+
+    def rebuild(self, databases):
+        '''Merge the lists in databases (later ones win) and the custom abbreviations
+        into the lookup structure.'''
+        started = time.monotonic()
+        journals = {}
+        for url in databases:
+            journals.update(self.db.execute('SELECT name, abbrev FROM listed WHERE url=? ORDER BY rowid', (url,)))
+        journals.update(self.db.execute('SELECT name, abbrev FROM custom'))
+        rows = []
+        for full_name, abbrev in journals.items():
+            rows.append((full_name, abbrev, 1))
+            if abbrev != full_name:
+                rows.append((abbrev, abbrev, 0))
+        postings = {}
+        for _id, (name, _, _) in enumerate(rows, 1):
+            for _t in trigrams(name):
+                postings.setdefault(_t, array('I')).append(_id)
+        for table in ('names', 'grams'):
+            self.db.execute(f'DELETE FROM {table}')
+        self.db.executemany('INSERT INTO names VALUES (?, ?, ?, ?, ?)',
+                            ((_id, name, normalize(name), abbrev, full)
+                             for _id, (name, abbrev, full) in enumerate(rows, 1)))
+        self.db.executemany('INSERT INTO grams VALUES (?, ?, ?)',
+                            ((_t, len(_ids), _ids.tobytes()) for _t, _ids in postings.items()))
+        self._setmeta(databases=json.dumps(list(databases)), count=len(journals), names=len(rows))
+        self.db.commit()
+        logger.debug(f'Indexed {len(journals)} journals, {len(postings)} trigrams '
+                     f'in {time.monotonic() - started:.1f} s.')
+
+    # Mapping of full names to abbreviations
+
+    def __len__(self) -> int:
+        return int(self._meta('count') or 0)
+
+    def get(self, name: str, default=None):
+        row = self.db.execute('SELECT abbrev FROM names WHERE name=? AND full=1 ORDER BY id LIMIT 1',
+                              (name,)).fetchone()
+        return row[0] if row else default
+
+    def __getitem__(self, name: str) -> str:
+        abbrev = self.get(name)
+        if abbrev is None:
+            raise KeyError(name)
+        return abbrev
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def items(self):
+        return iter(self.db.execute('SELECT name, abbrev FROM names WHERE full=1 ORDER BY id'))
+
+    def __iter__(self):
+        return (name for name, _ in self.items())
+
+    def update(self, journals: Dict[str, str]):
+        '''Add or change abbreviations in place; they are kept as custom abbreviations.'''
+        changed = {_k: _v for _k, _v in journals.items() if self.get(_k) != _v}
+        if not changed:
+            return
+        names = int(self._meta('names') or 0)
+        count = len(self)
+        for full_name, abbrev in changed.items():
+            self.db.execute('INSERT OR REPLACE INTO custom VALUES (?, ?)', (full_name, abbrev))
+            if self.db.execute('UPDATE names SET abbrev=? WHERE name=? AND full=1',
+                               (abbrev, full_name)).rowcount:
+                new = []
+            else:
+                new = [(full_name, 1)]
+                count += 1
+            if abbrev != full_name and not self.db.execute('SELECT 1 FROM names WHERE name=?',
+                                                           (abbrev,)).fetchone():
+                new.append((abbrev, 0))
+            for name, full in new:
+                names += 1
+                self.db.execute('INSERT INTO names VALUES (?, ?, ?, ?, ?)',
+                                (names, name, normalize(name), abbrev, full))
+                for _t in trigrams(name):
+                    row = self.db.execute('SELECT ids FROM grams WHERE gram=?', (_t,)).fetchone()
+                    _ids = array('I', row[0] if row else b'')
+                    _ids.append(names)
+                    self.db.execute('INSERT OR REPLACE INTO grams VALUES (?, ?, ?)',
+                                    (_t, len(_ids), _ids.tobytes()))
+        self._setmeta(count=count, names=names)
+        self.db.commit()
+
+    # Lookups
+
+    def is_abbreviation(self, name: str) -> bool:
+        return self.db.execute('SELECT 1 FROM names WHERE abbrev=? LIMIT 1', (name,)).fetchone() is not None
+
+    def _candidates(self, journal: str) -> list:
+        grams = list(trigrams(journal))
+        if not grams:
+            return []
+        # Rank by the number of shared trigrams, skipping only the few that occur in most names
+        limit = max(CANDIDATES, int(int(self._meta('names') or 0) * COMMON))
+        hits = Counter()
+        for (_ids,) in self.db.execute(f'SELECT ids FROM grams WHERE gram IN ({_marks(grams)}) AND n<=?',
+                                       grams + [limit]):
+            hits.update(array('I', _ids))
+        return [_id for _id, _ in hits.most_common(CANDIDATES)]
+
+    def best_match(self, journal: str) -> Tuple[str, float]:
+        '''Return (abbreviation, Levenshtein ratio) of the closest full name or abbreviation.'''
+        row = self.db.execute('SELECT abbrev FROM names WHERE name=? ORDER BY id LIMIT 1', (journal,)).fetchone()
+        if row:
+            return row[0], 1.0
+        best_match = ('', 0)
+        ids = self._candidates(journal)
+        # Names equal up to case, spacing or punctuation are always scored;
+        # in id order, so ties resolve like a full scan
+        for _, name, abbrev in self.db.execute(
+                f'SELECT id, name, abbrev FROM names WHERE norm=? OR id IN ({_marks(ids)}) ORDER BY id',
+                [normalize(journal)] + ids):
+            score = Levenshtein.ratio(journal, name)
+            if score > best_match[1]:
+                best_match = (abbrev, score)
+        return best_match
+
+    def close(self):
+        self.db.close()
@@ -3,9 +3,10 @@ import asyncio
 import logging
 import random
 from tqdm.asyncio import tqdm_asyncio
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from typing import List, Optional, Union, Tuple, Dict
 from .getdoilogger import return_logger as getlogger
+from .httpclient import new_client
 
 logger = getlogger(__name__)
 
@@ -44,7 +45,8 @@ async def download_pdf_from_url(
     client: httpx.AsyncClient,
     url: str,
     retries: int = 3,
-    timeout: float = 45.0 # Increased timeout for potentially large PDF downloads or slow servers
+    timeout: float = 45.0, # Increased timeout for potentially large PDF downloads or slow servers
+    headers: Optional[Dict[str, str]] = None
 ) -> Union[bytes, None]:
     """
     Asynchronously downloads a PDF from a given URL.
@@ -58,6 +60,7 @@ async def download_pdf_from_url(
         url: The URL from which to download the PDF.
         retries: The maximum number of download attempts.
         timeout: The timeout in seconds for each request.
+        headers: Optional per-request headers (for clients shared with other callers).
 
     Returns:
         The PDF content as bytes if successful, otherwise None.
@@ -68,7 +71,7 @@ async def download_pdf_from_url(
 
     for attempt in range(1, retries + 1):
         try:
-            response = await client.get(url, follow_redirects=True, timeout=timeout)
+            response = await client.get(url, headers=headers, follow_redirects=True, timeout=timeout)
             response.raise_for_status()  # Raises HTTPStatusError for 4xx/5xx responses
 
             content_type = response.headers.get("Content-Type", "").lower()
@@ -176,7 +179,8 @@ async def download_pdfs(
     proxy: Optional[str] = None,
     concurrent_downloads: int = 5,
     request_timeout: float = 45.0,
-    num_retries: int = 6
+    num_retries: int = 6,
+    client: Optional[httpx.AsyncClient] = None
 ) -> Dict[str, Union[bytes, None]]:
     """
     Asynchronously downloads multiple PDFs from a list of URLs.
@@ -189,6 +193,8 @@ async def download_pdfs(
         concurrent_downloads: The maximum number of PDFs to download simultaneously.
         request_timeout: Timeout in seconds for each individual request.
         num_retries: Number of retries for each URL.
+        client: Optional. A pooled httpx.AsyncClient to reuse; one is created
+                (and closed) for this batch if not provided.
 
     Returns:
         A dictionary mapping each URL to its downloaded PDF content (as bytes)
@@ -223,14 +229,20 @@ async def download_pdfs(
                 client,
                 url_to_download,
                 retries=num_retries,
-                timeout=request_timeout
+                timeout=request_timeout,
+                headers=headers
             )
             logger.debug(f"Semaphore released for {url_to_download}")
             return content
 
     # Create a single AsyncClient session to be reused for all requests
     # This allows connection pooling and better performance.
-    async with httpx.AsyncClient(proxy=proxy, headers=headers, timeout=request_timeout, follow_redirects=True) as client:
+    if client is None:
+        _client = new_client(proxy=proxy, headers=headers, timeout=request_timeout,
+                             max_connections=concurrent_downloads)
+    else:
+        _client = nullcontext(client)
+    async with _client as client:
         tasks = []
         for url in urls:
             # Create a download task for each URL
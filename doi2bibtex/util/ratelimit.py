@@ -0,0 +1,131 @@
+'''Adaptive per-host rate limiting shared by every request the http client sends'''
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from .getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+# Requests/second per host, from their published limits; unknown hosts are not limited.
+# These are the starting rates and, until a response advertises its own limit,
+# the ceiling the additive increase recovers up to after backing off.
+RATES = {'doi.org': 5,
+         'dx.doi.org': 5,
+         'api.crossref.org': 5,
+         'data.crossref.org': 5,
+         'api.openalex.org': 10}
+MIN_RATE = 0.5
+INCREASE = 0.1     # Additive increase per successful response
+DECREASE = 0.5     # Multiplicative decrease on 429/503
+
+
+def _header(headers, *names) -> Optional[str]:
+    for name in names:
+        if name in headers:
+            return headers[name]
+    return None
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    '''Parse a delta-seconds or HTTP-date header value into seconds from now.'''
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    '''Token bucket for one host whose rate adapts (AIMD) to what the upstream tells us.'''
+
+    def __init__(self, host: str, rate: float, max_rate: Optional[float] = None):
+        self.host = host
+        self.rate = float(rate)
+        self.max_rate = float(max_rate or rate)  # Replaced by the limit the host advertises
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = None
+        self._loop = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        '''The lock serializing acquire(), created on (and for) the running event loop.'''
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _refill(self, now: float):
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        '''Wait until a request to this host is allowed.'''
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def feedback(self, status: int, headers):
+        '''Adjust the rate from a response's status code and rate-limit headers.'''
+        limit = _header(headers, 'x-ratelimit-limit', 'x-rate-limit-limit')
+        interval = _header(headers, 'x-ratelimit-interval', 'x-rate-limit-interval')
+        if limit:
+            try:
+                _interval = float((interval or '1').rstrip('s')) or 1.0
+                self.max_rate = max(MIN_RATE, float(limit) / _interval)
+                self.rate = min(self.rate, self.max_rate)
+            except ValueError:
+                pass
+        if status in (429, 503):
+            wait = _seconds(_header(headers, 'retry-after'))
+            self.rate = max(MIN_RATE, self.rate * DECREASE)
+            self.block(wait if wait is not None else 1 / self.rate)
+            logger.debug(f"{self.host} returned {status}, backing off to {self.rate:.1f}/s")
+            return
+        remaining = _header(headers, 'x-ratelimit-remaining', 'x-rate-limit-remaining')
+        if remaining is not None and remaining.strip() == '0':
+            reset = _seconds(_header(headers, 'x-ratelimit-reset', 'x-rate-limit-reset'))
+            if reset is not None:
+                if reset > 1e6:  # Epoch timestamp rather than seconds
+                    reset = max(0.0, reset - time.time())
+                self.block(reset)
+            return
+        if status < 400:
+            self.rate = min(self.max_rate, self.rate + INCREASE)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_limiter(host: str) -> Optional[RateLimiter]:
+    '''Return the shared limiter for host, or None if the host is not rate limited.'''
+    if host not in _limiters:
+        if host not in RATES:
+            return None
+        _limiters[host] = RateLimiter(host, RATES[host])
+    return _limiters[host]
+
+
+def set_rate(host: str, rate: float):
+    '''Set (or add) the starting rate of host.'''
+    RATES[host] = rate
+    _limiters.pop(host, None)
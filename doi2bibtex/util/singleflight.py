@@ -0,0 +1,62 @@
+'''Coalesce concurrent calls for the same key into one in-flight request'''
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .getdoilogger import return_logger
+
+logger = return_logger(__name__)
+
+
+class SingleFlight:
+    '''Share one running task between every caller that asks for the same key.
+
+    The task is forgotten as soon as it finishes, so this only removes
+    duplicate work that overlaps in time; the DOI cache handles the rest.'''
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        task = self.inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _t: self._forget(key, _t))
+        else:
+            self.shared += 1
+            logger.debug(f"Joining in-flight {self.name} for {key}")
+        # A caller that gets cancelled must not cancel the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+
+
+def singleflight(key: Callable[..., Hashable]):
+    '''Decorate a coroutine function so concurrent calls with the same key(*args, **kwargs) share one call.
+
+    key may return None to opt a call out of coalescing.'''
+    def decorator(fn):
+        group = SingleFlight(fn.__name__)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            _key = key(*args, **kwargs)
+            if _key is None:
+                return await fn(*args, **kwargs)
+            return await group.do(_key, lambda: fn(*args, **kwargs))
+        wrapper.group = group
+        return wrapper
+    return decorator
+
+
+def doi_key(doi, *args, **kwargs):
+    '''Normalized DOI (str or bytes) for use as a singleflight key.'''
+    if isinstance(doi, bytes):
+        doi = str(doi, encoding='utf-8')
+    if not doi:
+        return None
+    return doi.strip().lower()
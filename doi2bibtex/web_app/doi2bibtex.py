@@ -4,7 +4,6 @@ from io import BytesIO
 from .output import list_dois, bib_bytes
 import doi2bibtex.bibtex as bibtex
 import doi2bibtex.util as util
-from asyncio_throttle import Throttler
 
 OK_TO_RUN=False
 try:
@@ -19,8 +18,6 @@ logger = util.getlogger(__name__)
 ALLOWED_EXTENSIONS = {'.txt', '.bib', '.tex'}
 ALLOWED_MIMETYPES = {"text/plain", "text/x-bibtex", "application/x-latex"}
 
-throttler = Throttler(rate_limit=3, period=1)
-
 def secure_filename(filename):
     _, ext = os.path.splitext(filename)
     return str(uuid.uuid4()) + ext
@@ -45,6 +42,10 @@ async def getparam(param) -> str:
 
 app = Quart(__name__)
 
+@app.after_serving
+async def close_http_client():
+    await util.close_client()
+
 @app.route("/")
 async def home():
     parse_options = ('doi2bibtex', 'references cited', 'citing references')#, 'references cited', 'citing references')
@@ -65,17 +66,17 @@ async def doi2bib():
         return home()
     logger.debug(f"Parsing {doi}")
     dois = [doi]
+    client = util.get_client()
     if doi_action == 'references cited':
-        dois = await bibtex.async_get_cited(dois)
+        dois = await bibtex.async_get_cited(dois, client=client)
     elif doi_action == 'citing references':
-        dois = await bibtex.async_get_citing(dois)
+        dois = await bibtex.async_get_citing(dois, client=client)
     library = bibtex.read('')
     async def process_doi(doi):
         nonlocal library
         if not doi:
             return
-        async with throttler:
-            result = await bibtex.async_get_bibtex_from_url(doi)
+        result = await bibtex.async_get_bibtex_from_url(doi, client=client)
         if result: 
             library.add(bibtex.read(result).entries[0])
     tasks = [process_doi(doi) for doi in set(dois)]
@@ -119,12 +120,12 @@ async def upload_file():
         dois = file_content.split(delim)
     dois += file_content.split('\n')
     library = bibtex.read('')
+    client = util.get_client()
     async def process_doi(doi):
         nonlocal library
         if not doi:
             return
-        async with throttler:
-            result = await bibtex.async_get_bibtex_from_url(doi)
+        result = await bibtex.async_get_bibtex_from_url(doi, client=client)
         if result: 
             library.add(bibtex.read(result).entries[0])
     tasks = [process_doi(doi) for doi in set(dois)]
@@ -0,0 +1,37 @@
+import bibtexparser
+from doi2bibtex.bibtex.fuzzy import find_duplicates, same_work
+
+AUTHOR = 'Smith, Jane and Doe, John'
+
+
+def _library(title1, title2):
+    return bibtexparser.parse_string(f'''@article{{one,
+  title = {{{title1}}},
+  author = {{{AUTHOR}}},
+  year = {{2020}}
+}}
+
+@article{{two,
+  title = {{{title2}}},
+  author = {{{AUTHOR}}},
+  year = {{2020}}
+}}
+''')
+
+
+def test_near_identical_titles_are_duplicates():
+    library = _library('Studies of charge transport in molecular junctions. Part 1',
+                       'Studies of Charge-Transport in Molecular Junctions, part 1')
+    assert find_duplicates(library.entries) == [['one', 'two']]
+
+
+def test_parts_of_a_series_are_not_duplicates():
+    library = _library('Studies of charge transport in molecular junctions. Part 1',
+                       'Studies of charge transport in molecular junctions. Part 2')
+    assert find_duplicates(library.entries) == []
+
+
+def test_roman_numerals_must_match():
+    fields = {'title': 'Studies of charge transport in molecular junctions II', 'author': AUTHOR}
+    assert same_work(fields, dict(fields))
+    assert not same_work(fields, dict(fields, title='Studies of charge transport in molecular junctions III'))
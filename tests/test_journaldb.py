@@ -0,0 +1,83 @@
+import random
+import Levenshtein
+from doi2bibtex.util.journaldb import JournalDB, normalize
+
+WORDS = ['Journal', 'Chemistry', 'Physical', 'Applied', 'Letters', 'Review', 'Materials', 'Science',
+         'Advanced', 'Energy', 'Biology', 'Molecular', 'International', 'Research', 'Communications',
+         'Surface', 'Catalysis', 'Polymer', 'Organic', 'Analytical']
+
+
+def _journals(n, seed=1):
+    rng = random.Random(seed)
+    journals = {}
+    while len(journals) < n:
+        words = rng.sample(WORDS, rng.randint(2, 5))
+        journals[' '.join(words)] = ' '.join(_w[:4] + '.' for _w in words)
+    return journals
+
+
+def _queries(journals, seed=2):
+    rng = random.Random(seed)
+    names = list(journals)
+    queries = [journals[_k].replace('.', '') for _k in rng.sample(names, 40)]
+    queries += [' '.join(_w[:4] for _w in _k.split()) for _k in rng.sample(names, 40)]
+    for name in rng.sample(names, 40):
+        chars = list(name)
+        chars[rng.randrange(len(chars))] = 'x'
+        queries.append(''.join(chars))
+    return queries
+
+
+def brute_force(journals, journal):
+    best_match = ('', 0)
+    for full_name, abbrev in journals.items():
+        for name in (full_name, abbrev):
+            score = Levenshtein.ratio(journal, name)
+            if score > best_match[1]:
+                best_match = (abbrev, score)
+    return best_match
+
+
+def test_normalize_ignores_punctuation():
+    assert normalize('J. Am. Chem. Soc.') == normalize('J Am  Chem Soc') == 'j am chem soc'
+
+
+def test_best_match_equals_brute_force():
+    journals = _journals(3000)
+    db = JournalDB.from_journals(journals)
+    for query in _queries(journals):
+        assert db.best_match(query) == brute_force(journals, query), query
+
+
+def test_unrelated_names_stay_below_threshold():
+    # Far from every name only the decision matters: nothing comes close enough to be suggested
+    journals = _journals(3000)
+    db = JournalDB.from_journals(journals)
+    for query in ('Nature', 'J. Unknown Stud.', ''):
+        assert db.best_match(query)[1] < 0.9
+        assert brute_force(journals, query)[1] < 0.9
+
+
+def test_dotless_abbreviation_is_scored():
+    journals = {'Journal of the American Chemical Society': 'J. Am. Chem. Soc.'} | _journals(500)
+    db = JournalDB.from_journals(journals)
+    assert db.best_match('J Am Chem Soc') == brute_force(journals, 'J Am Chem Soc')
+    assert db.best_match('J Am Chem Soc')[0] == 'J. Am. Chem. Soc.'
+
+
+def test_merged_lists_equal_brute_force():
+    first, second = _journals(1500, seed=3), _journals(1500, seed=4)
+    second.update((_k, _v.upper()) for _k, _v in list(first.items())[:200])  # Later lists win
+    db = JournalDB(':memory:')
+    db.set_source('first', first)
+    db.set_source('second', second)
+    db.set_custom('Journal of Custom Studies', 'J. Cust. Stud.')
+    db.rebuild(['first', 'second'])
+    db.update({'Letters in Applied Surface Research': 'Lett. Appl. Surf. Res.'})
+    merged = first | second | {'Journal of Custom Studies': 'J. Cust. Stud.',
+                               'Letters in Applied Surface Research': 'Lett. Appl. Surf. Res.'}
+    assert len(db) == len(merged)
+    assert dict(db.items()) == merged
+    queries = _queries(merged, seed=5) + ['J Cust Stud', 'Letters in Applied Surface Reserch']
+    for query in queries:
+        assert db.best_match(query) == brute_force(merged, query), query
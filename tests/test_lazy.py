@@ -0,0 +1,59 @@
+import bibtexparser
+from bibtexparser.model import Entry, Field
+from doi2bibtex.bibtex.lazy import LazyLibrary
+from doi2bibtex.bibtex.read import load_bib
+
+BIB = '''@article{a1,
+  title = {First Title},
+  note = {Line one
+@ line two},
+  doi = {10.1234/a1}
+}
+
+@article{a2,
+  title = {Second Title},
+  doi = {10.1234/a2}
+}
+'''
+
+
+def _render(entries):
+    library = bibtexparser.Library()
+    library.add(entries)
+    return bibtexparser.write_string(library)
+
+
+def _write(tmp_path):
+    path = tmp_path / 'library.bib'
+    path.write_text(BIB, encoding='utf-8')
+    return str(path)
+
+
+def test_at_leading_field_line_stays_in_its_entry(tmp_path):
+    lib = LazyLibrary(_write(tmp_path))
+    assert len(lib) == 2
+    entry = lib.get('a1')
+    assert entry is not None
+    assert entry.fields_dict['doi'].value == '10.1234/a1'
+    assert [_e.key for _e in lib.entries] == ['a1', 'a2']
+    assert [_e.key for _e in lib.entries] == [_e.key for _e in load_bib(lib.path).entries]
+    lib.close()
+
+
+def test_build_index_sees_doi_after_at_line(tmp_path):
+    lib = LazyLibrary(_write(tmp_path))
+    index = lib.build_index()
+    assert index.has_doi('10.1234/a1')
+    assert index.has_doi('10.1234/a2')
+    lib.close()
+
+
+def test_replace_and_write_drop_the_whole_old_block(tmp_path):
+    path = _write(tmp_path)
+    lib = LazyLibrary(path)
+    lib.replace(Entry('article', 'a1', [Field('title', 'New Title'), Field('doi', '10.1234/a1')]))
+    lib.write(path, _render)
+    text = open(path, encoding='utf-8').read()
+    assert 'line two' not in text
+    assert 'New Title' in text
+    assert [_e.key for _e in load_bib(path).entries] == ['a1', 'a2']
@@ -0,0 +1,33 @@
+import bibtexparser
+from doi2bibtex.bibtex.read import load_bib_parallel, layers
+
+
+def _bib():
+    blocks = ['@string{prl = "Phys. Rev. Lett."}',
+              '% Physics journals',
+              '@string{jacs = "J. Am. Chem. Soc."}']
+    for i in range(40):
+        blocks.append(f'@article{{key{i},\n  title = {{Title {i}}},\n'
+                      f'  journal = {"prl" if i % 2 else "jacs"},\n'
+                      f'  note = {{Line one\n@ line two of the note}},\n  year = {{2020}}\n}}')
+        if i % 10 == 3:
+            blocks.append(f'% Comment after entry {i}')
+    blocks.append('% Trailing comment')
+    return '\n\n'.join(blocks) + '\n'
+
+
+def _summary(library):
+    return [(type(_b).__name__, getattr(_b, 'key', None),
+             tuple((_f.key, _f.value) for _f in getattr(_b, 'fields', [])))
+            for _b in library.blocks]
+
+
+def test_parallel_matches_serial(tmp_path):
+    path = tmp_path / 'library.bib'
+    path.write_text(_bib(), encoding='utf-8')
+    serial = bibtexparser.parse_file(str(path), append_middleware=layers)
+    parallel = load_bib_parallel(str(path), workers=2)
+    assert not serial.failed_blocks
+    assert not parallel.failed_blocks
+    assert _summary(parallel) == _summary(serial)
+    assert [_s.key for _s in parallel.strings] == ['prl', 'jacs']